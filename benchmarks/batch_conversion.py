@@ -0,0 +1,54 @@
+"""
+Benchmark of the batch conversion by ``to_models`` against the serial conversion.
+
+The speedup depends on the number of CPUs and on the size of the circuits,
+since each circuit is pickled to and from a worker process.
+
+Usage: python benchmarks/batch_conversion.py
+"""
+import os
+import random
+import time
+from typing import List
+
+from qulacs import QuantumCircuit
+
+from qulacsvis.qulacs.circuit import to_models
+
+QUBIT_COUNT = 16
+GATE_COUNT = 2000
+CIRCUIT_COUNTS = [100, 1000]
+
+
+def random_circuit(gate_count: int, qubit_count: int, seed: int) -> QuantumCircuit:
+    rng = random.Random(seed)
+    circuit = QuantumCircuit(qubit_count)
+    for _ in range(gate_count):
+        target = rng.randrange(qubit_count)
+        if rng.random() < 0.5:
+            circuit.add_RX_gate(target, rng.random())
+        else:
+            circuit.add_CNOT_gate((target + 1) % qubit_count, target)
+    return circuit
+
+
+if __name__ == "__main__":
+    workers = os.cpu_count() or 1
+    print(f"{workers} workers")
+    print(f"{'circuits':>10} {'serial [s]':>11} {'pool [s]':>10} {'speedup':>8}")
+    for circuit_count in CIRCUIT_COUNTS:
+        circuits: List[QuantumCircuit] = [
+            random_circuit(GATE_COUNT, QUBIT_COUNT, seed)
+            for seed in range(circuit_count)
+        ]
+        start = time.perf_counter()
+        serial = to_models(circuits, workers=1)
+        serial_time = time.perf_counter() - start
+        start = time.perf_counter()
+        pooled = to_models(circuits, workers=workers, serial_threshold=0)
+        pool_time = time.perf_counter() - start
+        assert pooled == serial
+        print(
+            f"{circuit_count:>10} {serial_time:>11.3f} {pool_time:>10.3f}"
+            f" {serial_time / pool_time:>8.2f}"
+        )
@@ -0,0 +1,32 @@
+"""
+Benchmark of appending a gate and taking a snapshot with ``CircuitDataBuilder``.
+
+The time per step should stay flat as the number of gates grows,
+since neither ``append`` nor ``snapshot`` copies the grid.
+
+Usage: python benchmarks/builder.py
+"""
+import time
+
+from layering import random_gates
+
+from qulacsvis.models.circuit import CircuitDataBuilder
+
+QUBIT_COUNT = 200
+GATE_COUNTS = [10**3, 10**4, 4 * 10**4]
+STEP_COUNT = 1000
+
+
+if __name__ == "__main__":
+    print(f"{'gates':>10} {'us/step':>8}")
+    for gate_count in GATE_COUNTS:
+        gates = random_gates(gate_count + STEP_COUNT, QUBIT_COUNT)
+        builder = CircuitDataBuilder(QUBIT_COUNT)
+        builder.extend(gates[:gate_count])
+        builder.snapshot()
+        start = time.perf_counter()
+        for gate in gates[gate_count:]:
+            builder.append(gate)
+            builder.snapshot()
+        elapsed = time.perf_counter() - start
+        print(f"{gate_count:>10} {elapsed / STEP_COUNT * 1e6:>8.2f}")
@@ -0,0 +1,36 @@
+"""
+Benchmark of the compact text mode against the default text mode.
+
+Usage: python benchmarks/compact_text.py
+"""
+import time
+
+from layering import random_gates
+
+from qulacsvis.models.circuit import CircuitData
+from qulacsvis.visualization import CompactTextCircuitDrawer, TextCircuitDrawer
+
+QUBIT_COUNT = 100
+GATE_COUNTS = [10**4, 10**5]
+
+
+if __name__ == "__main__":
+    print(
+        f"{'layers':>8} {'text [MB]':>10} {'compact [MB]':>13}"
+        f" {'text [s]':>9} {'compact [s]':>12}"
+    )
+    for gate_count in GATE_COUNTS:
+        circuit = CircuitData.from_gate_sequence(
+            random_gates(gate_count, QUBIT_COUNT), QUBIT_COUNT
+        )
+        sizes = []
+        times = []
+        for drawer_class in (TextCircuitDrawer, CompactTextCircuitDrawer):
+            start = time.perf_counter()
+            text = drawer_class(circuit).render()
+            times.append(time.perf_counter() - start)
+            sizes.append(len(text.encode("utf-8")) / 2**20)
+        print(
+            f"{circuit.layer_count:>8} {sizes[0]:>10.2f} {sizes[1]:>13.2f}"
+            f" {times[0]:>9.3f} {times[1]:>12.3f}"
+        )
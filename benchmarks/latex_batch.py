@@ -0,0 +1,36 @@
+"""
+Benchmark of ``render_latex_batch`` against ``circuit_drawer`` per circuit.
+
+Requires pdflatex and pdftocairo.
+
+Usage: python benchmarks/latex_batch.py
+"""
+import time
+
+from layering import random_gates
+
+from qulacsvis import circuit_drawer
+from qulacsvis.models.circuit import CircuitData
+from qulacsvis.visualization import render_latex_batch
+
+QUBIT_COUNT = 4
+GATE_COUNT = 40
+CIRCUIT_COUNTS = [10, 100]
+
+
+if __name__ == "__main__":
+    print(f"{'circuits':>8} {'each [s]':>10} {'batch [s]':>10} {'speedup':>8}")
+    for circuit_count in CIRCUIT_COUNTS:
+        circuit = CircuitData.from_gate_sequence(
+            random_gates(GATE_COUNT, QUBIT_COUNT), QUBIT_COUNT
+        )
+        circuits = [circuit] * circuit_count
+        start = time.perf_counter()
+        for circuit in circuits:
+            circuit_drawer(circuit, "latex")
+        each = time.perf_counter() - start
+
+        start = time.perf_counter()
+        render_latex_batch(circuits)
+        batch = time.perf_counter() - start
+        print(f"{circuit_count:>8} {each:>10.2f} {batch:>10.2f} {each / batch:>8.1f}")
@@ -0,0 +1,31 @@
+"""
+Benchmark of ``LatexSourceGenerator.generate``.
+
+The time per layer should stay flat as the depth grows.
+
+Usage: python benchmarks/latex_source.py
+"""
+import time
+
+from layering import random_gates
+
+from qulacsvis.models.circuit import CircuitData
+from qulacsvis.visualization import LatexSourceGenerator
+
+QUBIT_COUNT = 16
+GATE_COUNTS = [10**4, 10**5, 4 * 10**5]
+
+
+if __name__ == "__main__":
+    print(f"{'layers':>8} {'time [s]':>10} {'us/layer':>9} {'size [MB]':>10}")
+    for gate_count in GATE_COUNTS:
+        circuit = CircuitData.from_gate_sequence(
+            random_gates(gate_count, QUBIT_COUNT), QUBIT_COUNT
+        )
+        start = time.perf_counter()
+        source = LatexSourceGenerator(circuit).generate()
+        elapsed = time.perf_counter() - start
+        print(
+            f"{circuit.layer_count:>8} {elapsed:>10.3f}"
+            f" {elapsed / circuit.layer_count * 1e6:>9.1f} {len(source) / 2**20:>10.2f}"
+        )
@@ -0,0 +1,43 @@
+"""
+Benchmark of the layering in ``CircuitData.from_gate_sequence``.
+
+The time per gate should stay flat as the number of gates grows.
+
+Usage: python benchmarks/layering.py
+"""
+import random
+import time
+from typing import List
+
+from qulacsvis.models.circuit import CircuitData, ControlQubitInfo, GateData
+
+QUBIT_COUNT = 200
+GATE_COUNTS = [10**3, 10**4, 10**5, 10**6]
+
+
+def random_gates(gate_count: int, qubit_count: int) -> List[GateData]:
+    rng = random.Random(0)
+    gates = []
+    for _ in range(gate_count):
+        target = rng.randrange(qubit_count)
+        if rng.random() < 0.5:
+            gates.append(GateData("X", [target]))
+        else:
+            control = rng.randrange(max(0, target - 4), min(qubit_count, target + 5))
+            if control == target:
+                control = (target + 1) % qubit_count
+            gates.append(GateData("CNOT", [target], [ControlQubitInfo(control, 1)]))
+    return gates
+
+
+if __name__ == "__main__":
+    print(f"{'gates':>10} {'layers':>8} {'time [s]':>10} {'us/gate':>8}")
+    for gate_count in GATE_COUNTS:
+        gates = random_gates(gate_count, QUBIT_COUNT)
+        start = time.perf_counter()
+        model = CircuitData.from_gate_sequence(gates, QUBIT_COUNT)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{gate_count:>10} {model.layer_count:>8} {elapsed:>10.3f}"
+            f" {elapsed / gate_count * 1e6:>8.2f}"
+        )
@@ -0,0 +1,59 @@
+"""
+Benchmark of the text rendering of ``TextCircuitDrawer``.
+
+The time per layer should stay flat as the depth grows, both when the picture
+is sized up front from ``layer_count`` and when it is grown layer by layer.
+Rendering a fixed window of layers should not depend on the depth.
+
+Usage: python benchmarks/text_rendering.py
+"""
+import contextlib
+import dataclasses
+import io
+import time
+
+from qulacsvis.models.circuit import CircuitData, ControlQubitInfo, GateData
+from qulacsvis.visualization import TextCircuitDrawer
+
+QUBIT_COUNT = 8
+DEPTHS = [500, 1000, 2000, 4000]
+WINDOW = 50
+
+
+def ladder_circuit(depth: int, qubit_count: int) -> CircuitData:
+    gates = []
+    for layer in range(depth):
+        target = layer % qubit_count
+        control = (target + 1) % qubit_count
+        gates.append(GateData("CNOT", [target], [ControlQubitInfo(control, 1)]))
+    return CircuitData.from_gate_sequence(gates, qubit_count)
+
+
+def render(circuit: CircuitData) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        TextCircuitDrawer(circuit).draw(verbose=False)
+    return time.perf_counter() - start
+
+
+def render_window(circuit: CircuitData) -> float:
+    middle = circuit.layer_count // 2
+    start = time.perf_counter()
+    TextCircuitDrawer(circuit, layers=(middle, middle + WINDOW)).render()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    print(
+        f"{'layers':>8} {'sized [s]':>10} {'grown [s]':>10} {'us/layer':>9}"
+        f" {'window [s]':>11}"
+    )
+    for depth in DEPTHS:
+        circuit = ladder_circuit(depth, QUBIT_COUNT)
+        sized = render(circuit)
+        grown = render(dataclasses.replace(circuit, layer_count=0))
+        print(
+            f"{circuit.layer_count:>8} {sized:>10.3f} {grown:>10.3f}"
+            f" {grown / circuit.layer_count * 1e6:>9.1f}"
+            f" {render_window(circuit):>11.4f}"
+        )
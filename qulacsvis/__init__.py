@@ -1 +1,2 @@
+from ._version import __version__  # noqa
 from .visualization import circuit_drawer  # noqa
@@ -0,0 +1,7 @@
+from importlib.metadata import PackageNotFoundError, version
+
+try:
+    __version__ = version("qulacsvis")
+except PackageNotFoundError:
+    # Not installed, e.g., imported from a source tree.
+    __version__ = "unknown"
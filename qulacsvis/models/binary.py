@@ -0,0 +1,253 @@
+"""
+Columnar binary format of ``CircuitData``.
+
+A file consists of a fixed-size preamble, a JSON header and raw arrays::
+
+    b"QVISCIRC" | header size (uint64, little endian) | JSON header | arrays
+
+The JSON header holds the circuit size, the interned gate names and the dtype,
+shape and offset of each array. Every array starts at a multiple of
+``_ALIGNMENT`` bytes so that it can be mapped with ``numpy.memmap``.
+
+Arrays
+------
+name_ids : int32 (gate_count,)
+    Index into the gate names of the header.
+target_offsets : int64 (gate_count + 1,)
+    ``targets[target_offsets[i]:target_offsets[i + 1]]`` are the targets of gate i.
+targets : int32
+    Target qubits of all gates.
+control_offsets : int64 (gate_count + 1,)
+    Same as ``target_offsets`` for ``control_indices`` and ``control_values``.
+control_indices : int32
+    Control qubits of all gates.
+control_values : int8
+    Control values of all gates.
+layers : int32 (gate_count,)
+    Layer of each gate.
+grid : int32 (qubit_count, layer_count)
+    Gate ids of ``GateGrid``.
+"""
+import json
+import os
+import struct
+import sys
+from typing import Any, Dict, List, Sequence, Union, overload
+
+import numpy as np
+import numpy.typing as npt
+
+from .circuit import (
+    CircuitData,
+    ControlQubitInfo,
+    GateData,
+    GateGrid,
+    as_gate_grid,
+)
+
+PathLike = Union[str, "os.PathLike[str]"]
+
+_MAGIC = b"QVISCIRC"
+_PREAMBLE = struct.Struct("<8sQ")
+_VERSION = 1
+_ALIGNMENT = 64
+
+
+def dump_binary(circuit: CircuitData, path: PathLike) -> None:
+    """
+    Save a CircuitData model in the columnar binary format.
+
+    Parameters
+    ----------
+    circuit : CircuitData
+        The circuit to be saved.
+    path : str or os.PathLike
+        Path of the file to be written.
+    """
+    grid = as_gate_grid(circuit.gates)
+    table = grid.table
+
+    name_index: Dict[str, int] = {}
+    name_ids = np.empty(len(table), dtype=np.int32)
+    target_counts = np.empty(len(table), dtype=np.int64)
+    control_counts = np.empty(len(table), dtype=np.int64)
+    targets: List[int] = []
+    control_indices: List[int] = []
+    control_values: List[int] = []
+    for i, gate in enumerate(table):
+        name_ids[i] = name_index.setdefault(gate.name, len(name_index))
+        target_counts[i] = len(gate.target_bits)
+        control_counts[i] = len(gate.control_bit_infos)
+        targets.extend(gate.target_bits)
+        control_indices.extend(gate.control_indices)
+        control_values.extend(gate.control_values)
+
+    arrays: Dict[str, npt.NDArray[Any]] = {
+        "name_ids": name_ids,
+        "target_offsets": _offsets(target_counts),
+        "targets": np.array(targets, dtype=np.int32),
+        "control_offsets": _offsets(control_counts),
+        "control_indices": np.array(control_indices, dtype=np.int32),
+        "control_values": np.array(control_values, dtype=np.int8),
+        "layers": np.asarray(grid.layers, dtype=np.int32),
+        "grid": np.ascontiguousarray(grid.ids, dtype=np.int32),
+    }
+
+    # The offsets of the arrays depend on the header size and vice versa,
+    # so they are counted from the end of the header and shifted afterwards.
+    array_specs: Dict[str, Dict[str, Any]] = {}
+    data_size = 0
+    for name, array in arrays.items():
+        array_specs[name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": data_size,
+        }
+        data_size = _align(data_size + array.nbytes)
+    header: Dict[str, Any] = {
+        "version": _VERSION,
+        "qubit_count": circuit.qubit_count,
+        "layer_count": circuit.layer_count,
+        "gate_count": len(table),
+        "names": list(name_index),
+    }
+    header_size = 0
+    while True:
+        header["arrays"] = {
+            name: dict(spec, offset=spec["offset"] + header_size)
+            for name, spec in array_specs.items()
+        }
+        header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        required_size = _align(_PREAMBLE.size + len(header_bytes))
+        if required_size <= header_size:
+            break
+        header_size = required_size
+    header_bytes = header_bytes.ljust(header_size - _PREAMBLE.size)
+
+    with open(path, "wb") as f:
+        f.write(_PREAMBLE.pack(_MAGIC, len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(header["arrays"][name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(header_size + data_size)
+
+
+def load_binary(path: PathLike, *, mmap: bool = True) -> CircuitData:
+    """
+    Load a CircuitData model saved by ``dump_binary``.
+
+    Parameters
+    ----------
+    path : str or os.PathLike
+        Path of the file to be read.
+    mmap : bool optional default=True
+        If True, the arrays are mapped with ``numpy.memmap`` and read lazily
+        when the gates and the grid are accessed. Otherwise they are read into memory.
+
+    Returns
+    -------
+    CircuitData
+        The loaded circuit. Its gates are a ``GateGrid`` whose gate table builds
+        ``GateData`` from the columns on access.
+
+    Raises
+    ------
+    ValueError
+        If the file is not in the columnar binary format.
+    """
+    with open(path, "rb") as f:
+        magic, header_size = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a qulacsvis binary circuit file.")
+        header = json.loads(f.read(header_size))
+    if header["version"] != _VERSION:
+        raise ValueError(f"Unsupported binary circuit version: {header['version']}")
+
+    arrays = {
+        name: _read_array(path, spec, mmap) for name, spec in header["arrays"].items()
+    }
+    table = _ColumnarGateTable([sys.intern(name) for name in header["names"]], arrays)
+    return CircuitData(
+        qubit_count=header["qubit_count"],
+        layer_count=header["layer_count"],
+        gates=GateGrid(arrays["grid"], table, arrays["layers"]),
+    )
+
+
+class _ColumnarGateTable(Sequence[GateData]):
+    """
+    Gate table backed by the columns of the binary format.
+
+    ``GateData`` is built when a gate is accessed, so opening a file does not
+    depend on the number of gates.
+    """
+
+    def __init__(self, names: List[str], arrays: Dict[str, npt.NDArray[Any]]):
+        self._names = names
+        self._name_ids = arrays["name_ids"]
+        self._target_offsets = arrays["target_offsets"]
+        self._targets = arrays["targets"]
+        self._control_offsets = arrays["control_offsets"]
+        self._control_indices = arrays["control_indices"]
+        self._control_values = arrays["control_values"]
+
+    @overload
+    def __getitem__(self, index: int) -> GateData:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[GateData]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[GateData, List[GateData]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("gate index out of range")
+
+        target_begin, target_end = self._target_offsets[index : index + 2].tolist()
+        control_begin, control_end = self._control_offsets[index : index + 2].tolist()
+        control_bit_infos = [
+            ControlQubitInfo(control_index, control_value)
+            for control_index, control_value in zip(
+                self._control_indices[control_begin:control_end].tolist(),
+                self._control_values[control_begin:control_end].tolist(),
+            )
+        ]
+        return GateData(
+            self._names[self._name_ids[index]],
+            self._targets[target_begin:target_end].tolist(),
+            control_bit_infos,
+        )
+
+    def __len__(self) -> int:
+        return len(self._name_ids)
+
+
+def _offsets(counts: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets
+
+
+def _align(position: int) -> int:
+    return -(-position // _ALIGNMENT) * _ALIGNMENT
+
+
+def _read_array(path: PathLike, spec: Dict[str, Any], mmap: bool) -> npt.NDArray[Any]:
+    dtype = np.dtype(spec["dtype"])
+    shape = tuple(spec["shape"])
+    count = int(np.prod(shape))
+    if count == 0:
+        # An empty region cannot be mapped.
+        return np.empty(shape, dtype=dtype)
+    if mmap:
+        return np.memmap(
+            path, dtype=dtype, mode="r", offset=spec["offset"], shape=shape
+        )
+    with open(path, "rb") as f:
+        f.seek(spec["offset"])
+        return np.fromfile(f, dtype=dtype, count=count).reshape(shape)
@@ -1,40 +1,348 @@
 import dataclasses
-from collections import deque
-from itertools import chain
-from typing import Deque, List, Optional, Sequence, Tuple
+import hashlib
+import json
+import os
+import sys
+from array import array
+from functools import cached_property
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    overload,
+)
 
 import dataclasses_json
+import numpy as np
+import numpy.typing as npt
+from typing_extensions import Final
+
+# Reserved codes of ``GateGrid.ids`` for cells that do not hold a gate.
+WIRE_ID: Final[int] = -1
+GHOST_ID: Final[int] = -2
 
 
 @dataclasses_json.dataclass_json
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
 class ControlQubitInfo:
+    """
+    Immutable information of a control qubit.
+
+    Attributes
+    ----------
+    index : int
+        Index of the control qubit.
+    control_value : int
+        The gate is applied when the control qubit has this value (0 or 1).
+    """
+
+    __slots__ = ("index", "control_value")
+
     index: int
     control_value: int
 
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (ControlQubitInfo, (self.index, self.control_value))
+
 
 @dataclasses_json.dataclass_json
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True, init=False)
 class GateData:
+    """
+    Immutable record of a gate.
+
+    The values derived from the target and control qubits are computed once
+    at construction and stored in slots next to the fields.
+
+    Parameters
+    ----------
+    name : str
+        Name of the gate.
+    target_bits : Iterable[int] optional
+        Target qubits of the gate.
+    control_bit_infos : Iterable[ControlQubitInfo] optional
+        Control qubits of the gate.
+
+    Attributes
+    ----------
+    indices : Tuple[int, ...]
+        Target qubits followed by control qubits.
+    control_indices : Tuple[int, ...]
+        Indices of the control qubits.
+    control_values : Tuple[int, ...]
+        Control values of the control qubits.
+    min_index : int
+        The smallest index in ``indices``. -1 if the gate acts on no qubit.
+    max_index : int
+        The largest index in ``indices``. -1 if the gate acts on no qubit.
+    """
+
+    __slots__ = (
+        "name",
+        "target_bits",
+        "control_bit_infos",
+        "indices",
+        "control_indices",
+        "control_values",
+        "min_index",
+        "max_index",
+    )
+
     name: str
-    target_bits: List[int] = dataclasses.field(default_factory=list)
-    control_bit_infos: List[ControlQubitInfo] = dataclasses.field(default_factory=list)
+    target_bits: Tuple[int, ...]
+    control_bit_infos: Tuple[ControlQubitInfo, ...]
 
-    @property
-    def indices(self) -> Tuple[int, ...]:
-        return tuple(chain(self.target_bits, (c.index for c in self.control_bit_infos)))
+    if TYPE_CHECKING:
+        # Derived slots, which are not part of the fields (and the JSON schema).
+        indices: Tuple[int, ...]
+        control_indices: Tuple[int, ...]
+        control_values: Tuple[int, ...]
+        min_index: int
+        max_index: int
 
-    @property
-    def max_index(self) -> int:
-        return max(self.indices)
+    def __init__(
+        self,
+        name: str,
+        target_bits: Iterable[int] = (),
+        control_bit_infos: Iterable[ControlQubitInfo] = (),
+    ):
+        target_bits = tuple(target_bits)
+        control_bit_infos = tuple(control_bit_infos)
+        control_indices = tuple(info.index for info in control_bit_infos)
+        indices = target_bits + control_indices
 
-    @property
-    def min_index(self) -> int:
-        return min(self.indices)
+        setattr_ = object.__setattr__
+        setattr_(self, "name", name)
+        setattr_(self, "target_bits", target_bits)
+        setattr_(self, "control_bit_infos", control_bit_infos)
+        setattr_(self, "indices", indices)
+        setattr_(self, "control_indices", control_indices)
+        setattr_(
+            self,
+            "control_values",
+            tuple(info.control_value for info in control_bit_infos),
+        )
+        setattr_(self, "min_index", min(indices, default=-1))
+        setattr_(self, "max_index", max(indices, default=-1))
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (GateData, (self.name, self.target_bits, self.control_bit_infos))
 
 
 GateDataSeq = Sequence[Sequence[GateData]]
 
+_WIRE_GATE = GateData("wire")
+_GHOST_GATE = GateData("ghost")
+
+
+class GateGrid(Sequence[Sequence[GateData]]):
+    """
+    Compact layer grid of a quantum circuit.
+
+    Instead of holding ``GateData("wire")`` and ``GateData("ghost")`` objects for
+    every empty cell, the grid is an int32 matrix of gate ids referring to a flat
+    table of gates. ``WIRE_ID`` and ``GHOST_ID`` are reserved for empty cells.
+    ``grid[qubit][layer]`` returns ``GateData`` as the nested list of
+    ``CircuitData.gates`` does.
+
+    Parameters
+    ----------
+    ids : numpy.ndarray
+        Matrix of gate ids with shape (qubit_count, layer_count).
+    table : Sequence[GateData]
+        Gates referred to by ``ids``.
+    layers : numpy.ndarray optional
+        Layer of each gate in ``table``.
+
+    Attributes
+    ----------
+    ids : numpy.ndarray
+        Matrix of gate ids with shape (qubit_count, layer_count).
+    table : Sequence[GateData]
+        Gates referred to by ``ids``.
+    layers : numpy.ndarray
+        Layer of each gate in ``table``. -1 for the gates not placed on the grid,
+        which are the gates without target qubits.
+    """
+
+    def __init__(
+        self,
+        ids: npt.ArrayLike,
+        table: Sequence[GateData],
+        layers: Optional[npt.ArrayLike] = None,
+    ):
+        self.ids = np.asarray(ids, dtype=np.int32)
+        self.table = table
+        if layers is None:
+            layers = _gate_layers(self.ids, len(table))
+        self.layers = np.asarray(layers, dtype=np.int32)
+        self._rows = tuple(_GateGridRow(self, qubit) for qubit in range(len(self.ids)))
+
+    def decode(self, gate_id: int) -> GateData:
+        """
+        Get the gate data corresponding to a gate id.
+
+        Parameters
+        ----------
+        gate_id : int
+            Gate id stored in ``ids``.
+
+        Returns
+        -------
+        GateData
+            Gate data of the id. The shared wire/ghost gate for reserved codes.
+        """
+        if gate_id >= 0:
+            return self.table[gate_id]
+        if gate_id == WIRE_ID:
+            return _WIRE_GATE
+        return _GHOST_GATE
+
+    def to_list(self) -> List[List[GateData]]:
+        """
+        Materialize the grid as nested lists of gate data.
+
+        Returns
+        -------
+        List[List[GateData]]
+            Gate data of each qubit and each layer.
+        """
+        return [list(row) for row in self._rows]
+
+    @overload
+    def __getitem__(self, qubit: int) -> "_GateGridRow":
+        ...
+
+    @overload
+    def __getitem__(self, qubit: slice) -> Sequence["_GateGridRow"]:
+        ...
+
+    def __getitem__(
+        self, qubit: Union[int, slice]
+    ) -> Union["_GateGridRow", Sequence["_GateGridRow"]]:
+        return self._rows[qubit]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        if isinstance(other, GateGrid):
+            # Gate ids may differ as long as the same gates are on the same cells.
+            if not np.array_equal(np.minimum(self.ids, 0), np.minimum(other.ids, 0)):
+                return False
+            anchors = self.ids >= 0
+            return all(
+                self.table[gate_id] == other.table[other_gate_id]
+                for gate_id, other_gate_id in zip(
+                    self.ids[anchors].tolist(), other.ids[anchors].tolist()
+                )
+            )
+        return len(self) == len(other) and all(
+            list(row) == list(other_row) for row, other_row in zip(self, other)
+        )
+
+    def __repr__(self) -> str:
+        return f"GateGrid(ids={self.ids!r}, table={self.table!r})"
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Rows are views of ``ids`` and are rebuilt instead of being pickled.
+        return (GateGrid, (np.array(self.ids), list(self.table), np.array(self.layers)))
+
+
+def as_gate_grid(gates: GateDataSeq) -> GateGrid:
+    """
+    Convert nested lists of gate data to a ``GateGrid``.
+
+    Parameters
+    ----------
+    gates : GateDataSeq
+        Gate data of each qubit and each layer, e.g., ``CircuitData.gates``.
+
+    Returns
+    -------
+    GateGrid
+        The grid of the gates. ``gates`` itself if it is already a ``GateGrid``.
+        Gates are numbered in the order of layers, and then of qubits.
+    """
+    if isinstance(gates, GateGrid):
+        return gates
+
+    qubit_count = len(gates)
+    layer_count = len(gates[0]) if qubit_count > 0 else 0
+    ids = np.full((qubit_count, layer_count), WIRE_ID, dtype=np.int32)
+    table: List[GateData] = []
+    for layer in range(layer_count):
+        for qubit in range(qubit_count):
+            gate = gates[qubit][layer]
+            if gate.name == "wire":
+                continue
+            elif gate.name == "ghost":
+                ids[qubit, layer] = GHOST_ID
+            else:
+                ids[qubit, layer] = len(table)
+                table.append(gate)
+    return GateGrid(ids, table)
+
+
+def _gate_layers(ids: npt.NDArray[np.int32], gate_count: int) -> npt.NDArray[np.int32]:
+    """
+    Find the layer of each gate from a grid of gate ids.
+
+    Parameters
+    ----------
+    ids : numpy.ndarray
+        Matrix of gate ids with shape (qubit_count, layer_count).
+    gate_count : int
+        Number of gates referred to by ``ids``.
+
+    Returns
+    -------
+    numpy.ndarray
+        Layer of each gate. -1 for the gates not placed on the grid.
+    """
+    layers = np.full(gate_count, -1, dtype=np.int32)
+    _, columns = np.nonzero(ids >= 0)
+    layers[ids[ids >= 0]] = columns
+    return layers
+
+
+class _GateGridRow(Sequence[GateData]):
+    """
+    Gates of a qubit in ``GateGrid``.
+    """
+
+    def __init__(self, grid: GateGrid, qubit: int):
+        self._grid = grid
+        self._ids = grid.ids[qubit]
+
+    @overload
+    def __getitem__(self, layer: int) -> GateData:
+        ...
+
+    @overload
+    def __getitem__(self, layer: slice) -> List[GateData]:
+        ...
+
+    def __getitem__(self, layer: Union[int, slice]) -> Union[GateData, List[GateData]]:
+        if isinstance(layer, slice):
+            return [self._grid.decode(gate_id) for gate_id in self._ids[layer].tolist()]
+        return self._grid.decode(int(self._ids[layer]))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Any:
+        return (self._grid.decode(gate_id) for gate_id in self._ids.tolist())
+
 
 @dataclasses_json.dataclass_json
 @dataclasses.dataclass
@@ -60,52 +368,474 @@ class CircuitData:
         Returns
         -------
         CircuitData : CircuitData
-            Constructed CircuitData model
+            Constructed CircuitData model whose gates are held by a ``GateGrid``
         """
         if qubit_count is None:
-            qubit_count = max(g.max_index for g in gates)
-        temp_lines: List[Deque[GateData]] = [deque() for _ in range(qubit_count)]
+            qubit_count = max(g.max_index for g in gates) + 1
+        return CircuitData.from_gate_stream(gates, qubit_count)
+
+    @staticmethod
+    def from_gate_stream(
+        gates: Iterable[GateData], qubit_count: Optional[int] = None
+    ) -> "CircuitData":
+        """
+        Construct a CircuitData model from an iterable of gates.
+
+        Gates are laid out one by one as they are consumed, so the input does not
+        need to be held in memory. Only the per-qubit frontier and the output
+        are kept during the construction.
+
+        Parameters
+        ----------
+        gates : Iterable[GateData]
+            Iterable of gates, e.g., a generator
+        qubit_count : int optional
+            Number of qubits this quantum circuit has.
+            If None, it is the largest qubit index of the gates plus one.
+
+        Returns
+        -------
+        CircuitData : CircuitData
+            Constructed CircuitData model whose gates are held by a ``GateGrid``
+
+        Raises
+        ------
+        ValueError
+            If a gate acts on a qubit out of ``qubit_count``.
+        """
+        layout = _GridLayout(qubit_count)
+        for gate in gates:
+            layout.add(gate)
+
+        return CircuitData(
+            qubit_count=layout.qubit_count,
+            layer_count=layout.layer_count,
+            gates=layout.to_gate_grid(),
+        )
+
+    @staticmethod
+    def from_jsonl(
+        source: Union[str, "os.PathLike[str]", IO[str]],
+        qubit_count: Optional[int] = None,
+    ) -> "CircuitData":
+        """
+        Construct a CircuitData model from JSON Lines of gates.
+
+        Each line is a gate in the JSON schema of ``GateData.to_json()``.
+        Empty lines are ignored. Lines are read and laid out one by one.
+
+        Parameters
+        ----------
+        source : str, os.PathLike or IO[str]
+            Path of the JSON Lines file or a text stream of it.
+        qubit_count : int optional
+            Number of qubits this quantum circuit has.
+            If None, it is the largest qubit index of the gates plus one.
+
+        Returns
+        -------
+        CircuitData : CircuitData
+            Constructed CircuitData model whose gates are held by a ``GateGrid``
+
+        Examples
+        --------
+        >>> with open("gates.jsonl", "w") as f:
+        >>>     f.write(GateData("X", [0]).to_json() + "\\n")
+        >>>     f.write(GateData("Y", [1]).to_json() + "\\n")
+        >>> circuit = CircuitData.from_jsonl("gates.jsonl")
+        """
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "r") as f:
+                return CircuitData.from_gate_stream(_read_jsonl_gates(f), qubit_count)
+        return CircuitData.from_gate_stream(_read_jsonl_gates(source), qubit_count)
+
+    def digest(self) -> str:
+        """
+        Compute a hash of the drawing of the circuit.
+
+        The hash covers the qubit count, the gates in insertion order
+        and their layers, so equal circuits have the same digest wherever
+        they are converted or loaded from.
+
+        Returns
+        -------
+        str
+            Hexadecimal digest of 32 characters.
+        """
+        grid = as_gate_grid(self.gates)
+        rolling_hash = hashlib.blake2b(digest_size=16)
+        rolling_hash.update(repr((self.qubit_count, len(grid.table))).encode())
+        for gate in grid.table:
+            rolling_hash.update(
+                repr(
+                    (
+                        gate.name,
+                        gate.target_bits,
+                        gate.control_indices,
+                        gate.control_values,
+                    )
+                ).encode()
+            )
+        rolling_hash.update(np.ascontiguousarray(grid.layers, dtype=np.int32).tobytes())
+        return rolling_hash.hexdigest()
+
+
+def _read_jsonl_gates(lines: Iterable[str]) -> Iterator[GateData]:
+    """
+    Decode gates from JSON Lines.
+
+    Parameters
+    ----------
+    lines : Iterable[str]
+        Lines each of which is a gate in the JSON schema of ``GateData``.
+
+    Yields
+    ------
+    GateData
+        The decoded gates.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        gate = json.loads(line)
+        yield GateData(
+            sys.intern(gate["name"]),
+            gate.get("target_bits", ()),
+            [
+                ControlQubitInfo(info["index"], info["control_value"])
+                for info in gate.get("control_bit_infos", ())
+            ],
+        )
+
+
+class _GridLayout:
+    """
+    Lay out gates into layers with a per-qubit frontier.
+
+    A gate is placed on the first layer in which every qubit of its span
+    (from ``min_index`` to ``max_index``) is free, which is the maximum of the
+    frontier over the span. Only the layer and the rows of each gate are recorded
+    while adding gates, and the grid is materialized at the end in one go.
+    A gate without target qubits, e.g., a probabilistic gate, is kept in the
+    table but is not placed on the grid, and its layer is -1.
+
+    Parameters
+    ----------
+    qubit_count : int optional
+        Number of qubits of the circuit.
+        If None, the frontier grows to the largest qubit index of the added gates.
+
+    Attributes
+    ----------
+    frontier : List[int]
+        The next free layer of each qubit.
+    table : List[GateData]
+        The added gates.
+    layers : array.array
+        The layer of each added gate.
+    """
+
+    def __init__(self, qubit_count: Optional[int] = None):
+        self.frontier = [0] * (qubit_count or 0)
+        self.table: List[GateData] = []
+        self.layers = array("i")
+        self._fixed_size = qubit_count is not None
+        self._anchor_rows = array("i")
+        self._ghost_rows = array("i")
+        self._ghost_layers = array("i")
+
+    @property
+    def qubit_count(self) -> int:
+        return len(self.frontier)
+
+    @property
+    def layer_count(self) -> int:
+        return max(self.frontier, default=0)
+
+    def add(self, gate: GateData) -> int:
+        """
+        Place a gate and record it for the grid.
+
+        Parameters
+        ----------
+        gate : GateData
+            The gate to be placed.
+
+        Returns
+        -------
+        int
+            The layer of the gate.
+        """
+        layer = self.place(gate)
+        self.table.append(gate)
+        self.layers.append(layer)
+        if layer < 0:
+            self._anchor_rows.append(-1)
+            return layer
+        anchor = gate.target_bits[0]
+        self._anchor_rows.append(anchor)
+        for target_bit in gate.target_bits[1:]:
+            if target_bit != anchor:
+                self._ghost_rows.append(target_bit)
+                self._ghost_layers.append(layer)
+        return layer
+
+    def place(self, gate: GateData) -> int:
+        """
+        Find the layer of a gate and advance the frontier over its span.
+
+        Parameters
+        ----------
+        gate : GateData
+            The gate to be placed.
+
+        Returns
+        -------
+        int
+            The layer of the gate. -1 if the gate has no target qubit.
+        """
+        if not gate.target_bits:
+            return -1
+        begin, end = gate.min_index, gate.max_index + 1
+        frontier = self.frontier
+        if end > len(frontier):
+            if self._fixed_size:
+                raise ValueError(
+                    f"{gate.name} gate acts on qubit {gate.max_index}, "
+                    f"but the circuit has only {len(frontier)} qubits."
+                )
+            frontier.extend([0] * (end - len(frontier)))
+        layer = max(frontier[begin:end])
+        frontier[begin:end] = [layer + 1] * (end - begin)
+        return layer
+
+    def to_gate_grid(self) -> "GateGrid":
+        """
+        Materialize the grid of the added gates.
+
+        Returns
+        -------
+        GateGrid
+            The laid out grid.
+        """
+        ids = np.full((self.qubit_count, self.layer_count), WIRE_ID, dtype=np.int32)
+        layers = np.frombuffer(self.layers, dtype=np.intc).astype(np.int32)
+        ids[
+            np.frombuffer(self._ghost_rows, dtype=np.intc),
+            np.frombuffer(self._ghost_layers, dtype=np.intc),
+        ] = GHOST_ID
+        placed = layers >= 0
+        ids[
+            np.frombuffer(self._anchor_rows, dtype=np.intc)[placed], layers[placed]
+        ] = np.arange(len(layers), dtype=np.int32)[placed]
+        return GateGrid(ids, self.table, layers)
+
+
+class CircuitDataBuilder:
+    """
+    Mutable builder of a CircuitData model.
+
+    Gates can be appended one by one. Each append places the gate with the
+    per-qubit frontier and writes its cells into a grid whose capacity doubles
+    when needed, so it costs amortized O(span) of the gate.
+    ``snapshot()`` returns a CircuitData sharing the buffers of the builder in
+    O(qubit_count), and its grid is materialized on the first access.
+    The buffers are never copied on append, because later gates are only written
+    on cells after the frontier of each qubit, which a snapshot masks as wires.
+
+    Parameters
+    ----------
+    qubit_count : int
+        Number of qubits of the circuit.
+
+    Examples
+    --------
+    >>> builder = CircuitDataBuilder(2)
+    >>> builder.append(GateData("X", [0]))
+    >>> circuit = builder.snapshot()
+    >>> builder.extend([GateData("CNOT", [1], [ControlQubitInfo(0, 1)])])
+    >>> circuit = builder.snapshot()
+    """
+
+    _INITIAL_CAPACITY = 16
+
+    def __init__(self, qubit_count: int):
+        self._layout = _GridLayout(qubit_count)
+        self._table: List[GateData] = []
+        self._layers = np.empty(self._INITIAL_CAPACITY, dtype=np.int32)
+        self._ids = np.full(
+            (qubit_count, self._INITIAL_CAPACITY), WIRE_ID, dtype=np.int32
+        )
+        self._layer_count = 0
+
+    @property
+    def qubit_count(self) -> int:
+        return self._layout.qubit_count
+
+    @property
+    def layer_count(self) -> int:
+        return self._layer_count
+
+    @property
+    def gate_count(self) -> int:
+        return len(self._table)
+
+    def append(self, gate: GateData) -> None:
+        """
+        Append a gate to the circuit.
+
+        Parameters
+        ----------
+        gate : GateData
+            The gate to be appended.
+
+        Raises
+        ------
+        ValueError
+            If the gate acts on a qubit out of ``qubit_count``.
+        """
+        layer = self._layout.place(gate)
+        gate_id = len(self._table)
+        if gate_id == len(self._layers):
+            self._layers = _grow(self._layers, 2 * gate_id)
+        if layer >= self._ids.shape[1]:
+            self._ids = _grow(self._ids, 2 * self._ids.shape[1], fill=WIRE_ID)
+
+        self._table.append(gate)
+        self._layers[gate_id] = layer
+        if layer < 0:
+            return
+        self._layer_count = max(self._layer_count, layer + 1)
+        anchor = gate.target_bits[0]
+        self._ids[anchor, layer] = gate_id
+        for target_bit in gate.target_bits[1:]:
+            if target_bit != anchor:
+                self._ids[target_bit, layer] = GHOST_ID
+
+    def extend(self, gates: Iterable[GateData]) -> None:
+        """
+        Append gates to the circuit.
+
+        Parameters
+        ----------
+        gates : Iterable[GateData]
+            The gates to be appended.
+        """
         for gate in gates:
-            _align_layers(temp_lines, gate.min_index, gate.max_index)
-            for index in range(gate.min_index, gate.max_index + 1):
-                line = temp_lines[index]
-                if index == gate.target_bits[0]:
-                    line.append(gate)
-                elif index in gate.target_bits:
-                    line.append(GateData("ghost"))
-                else:
-                    line.append(GateData("wire"))
-
-        _align_layers(temp_lines, 0, qubit_count)
-        layer_count = len(temp_lines[0])
+            self.append(gate)
+
+    def snapshot(self) -> CircuitData:
+        """
+        Get the circuit built so far.
+
+        The returned model shares the buffers of the builder and is not affected
+        by the gates appended afterwards.
+
+        Returns
+        -------
+        CircuitData
+            The circuit built so far.
+        """
+        layers = self._layers[: self.gate_count]
+        layers.flags.writeable = False
         return CircuitData(
-            qubit_count=qubit_count,
-            layer_count=layer_count,
-            gates=[list(queue) for queue in temp_lines],
+            qubit_count=self.qubit_count,
+            layer_count=self._layer_count,
+            gates=_SnapshotGrid(
+                self._ids,
+                np.array(self._layout.frontier, dtype=np.int32),
+                _TablePrefix(self._table, self.gate_count),
+                layers,
+            ),
         )
 
 
-def _align_layers(
-    lines: Sequence[Deque[GateData]], min_line_index: int, max_line_index: int
-) -> None:
+class _SnapshotGrid(GateGrid):
+    """
+    Grid of a ``CircuitDataBuilder`` snapshot materialized on the first access.
+
+    The builder keeps writing into ``buffer`` after the snapshot, but only on cells
+    at or after the frontier of each qubit, which are wires in the snapshot.
     """
-    Align layer sizes for a specified range of rows.
+
+    def __init__(
+        self,
+        buffer: npt.NDArray[np.int32],
+        frontier: npt.NDArray[np.int32],
+        table: Sequence[GateData],
+        layers: npt.NDArray[np.int32],
+    ):
+        self._buffer: Optional[npt.NDArray[np.int32]] = buffer
+        self._frontier = frontier
+        self.table = table
+        self.layers = layers
+
+    @cached_property
+    def ids(self) -> npt.NDArray[np.int32]:  # type: ignore[override]
+        assert self._buffer is not None
+        layer_count = int(self._frontier.max(initial=0))
+        ids = self._buffer[:, :layer_count].copy()
+        ids[np.arange(layer_count) >= self._frontier[:, np.newaxis]] = WIRE_ID
+        ids.flags.writeable = False
+        # The buffer may be grown and dropped by the builder.
+        self._buffer = None
+        return ids
+
+    @cached_property
+    def _rows(self) -> Tuple["_GateGridRow", ...]:  # type: ignore[override]
+        return tuple(_GateGridRow(self, qubit) for qubit in range(len(self.ids)))
+
+
+class _TablePrefix(Sequence[GateData]):
+    """
+    Read-only view of the first gates of a gate table.
+    """
+
+    def __init__(self, table: List[GateData], length: int):
+        self._table = table
+        self._length = length
+
+    @overload
+    def __getitem__(self, index: int) -> GateData:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[GateData]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[GateData, List[GateData]]:
+        if isinstance(index, slice):
+            return [self._table[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("gate index out of range")
+        return self._table[index]
+
+    def __len__(self) -> int:
+        return self._length
+
+
+def _grow(
+    buffer: npt.NDArray[np.int32], capacity: int, fill: int = 0
+) -> npt.NDArray[np.int32]:
+    """
+    Reallocate a buffer with a larger capacity along its last axis.
 
     Parameters
     ----------
-    lines: Sequence[Deque[GateData]]
-        Circuit data during parsing without layer length alignment
-    min_line_index : int
-        Minimum row index to be aligned.
-    max_line_index : int
-        Maximum row index to be aligned.
-    """
-    if min_line_index > max_line_index:
-        min_line_index, max_line_index = max_line_index, min_line_index
-    lines = lines[min_line_index : max_line_index + 1]
-    layer_counts = [len(queue) for queue in lines]
-    max_layer_count = max(layer_counts)
-
-    for queue, layer_count in zip(lines, layer_counts):
-        for _ in range(max_layer_count - layer_count):
-            queue.append(GateData("wire"))
+    buffer : numpy.ndarray
+        The buffer to be grown.
+    capacity : int
+        The new size of the last axis.
+    fill : int optional default=0
+        The value of the new elements.
+
+    Returns
+    -------
+    numpy.ndarray
+        The new buffer containing the elements of ``buffer``.
+    """
+    grown = np.full(buffer.shape[:-1] + (capacity,), fill, dtype=buffer.dtype)
+    grown[..., : buffer.shape[-1]] = buffer
+    return grown
@@ -1,20 +1,231 @@
-from qulacs import QuantumCircuit
+import dataclasses
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Hashable, List, Optional, Sequence, Tuple
 
-from ..models.circuit import CircuitData, ControlQubitInfo, GateData
+from qulacs import QuantumCircuit, QuantumGateBase
 
+from ..models.circuit import (
+    CircuitData,
+    CircuitDataBuilder,
+    ControlQubitInfo,
+    GateData,
+    GateGrid,
+)
+from ..utils.cache import CacheInfo, LRUCache  # noqa: F401
 
-def to_model(circuit: QuantumCircuit) -> CircuitData:
-    qubit_count = circuit.get_qubit_count()
-    gates = []
 
+def to_gate_data(gate: QuantumGateBase) -> GateData:
+    target_index_list = gate.get_target_index_list()
+    control_index_value_list = [
+        ControlQubitInfo(index, control_value)
+        for index, control_value in gate.get_control_index_value_list()
+    ]
+    gate_name = gate.get_name()
+    return GateData(gate_name, target_index_list, control_index_value_list)
+
+
+GateSignature = Tuple[str, Tuple[int, ...], Tuple[Tuple[int, int], ...]]
+
+
+class ConversionCache(LRUCache[Hashable, CircuitData]):
+    """
+    LRU cache of CircuitData models converted from qulacs circuits.
+
+    Models are keyed by the qubit count and the signatures (name, target and
+    control qubits) of all the gates, which are compared exactly on a lookup.
+    Reading the signatures is much cheaper than building the gate data and
+    laying them out, which a hit skips.
+
+    Parameters
+    ----------
+    maxsize : int optional default=32
+        The maximum number of cached models.
+        The least recently used model is evicted when it is exceeded.
+    """
+
+    def __init__(self, maxsize: int = 32):
+        super().__init__(maxsize)
+
+
+conversion_cache = ConversionCache()
+
+
+def fingerprint(circuit: QuantumCircuit) -> Hashable:
+    """
+    Compute a fingerprint of a circuit, which identifies its drawing.
+
+    The fingerprint consists of the qubit count, the gate count and a hash
+    rolled over the signatures (name, target and control qubits) of the gates.
+    Gate parameters are not included since they are not drawn.
+
+    Parameters
+    ----------
+    circuit : QuantumCircuit
+        The circuit to be fingerprinted.
+
+    Returns
+    -------
+    Hashable
+        The fingerprint of the circuit.
+    """
+    signatures = _gate_signatures(circuit)
+    rolling_hash = hashlib.blake2b(digest_size=16)
+    for signature in signatures:
+        rolling_hash.update(repr(signature).encode())
+    return (circuit.get_qubit_count(), len(signatures), rolling_hash.digest())
+
+
+def to_model(circuit: QuantumCircuit, *, use_cache: bool = True) -> CircuitData:
+    """
+    Convert a qulacs circuit to a CircuitData model.
+
+    Parameters
+    ----------
+    circuit : QuantumCircuit
+        The circuit to be converted.
+    use_cache : bool optional default=True
+        If True, the model is looked up in and stored to ``conversion_cache``.
+        A cached model is returned as a shallow copy sharing its read-only grid.
+
+    Returns
+    -------
+    CircuitData
+        The converted model.
+    """
+    if not use_cache:
+        return _convert(circuit)
+
+    # The signatures are reused to build the model on a miss,
+    # so the circuit is walked only once either way.
+    signatures = _gate_signatures(circuit)
+    key = (circuit.get_qubit_count(), signatures)
+    model = conversion_cache.get(key)
+    if model is None:
+        gates = (
+            GateData(
+                name,
+                target_index_list,
+                [ControlQubitInfo(index, value) for index, value in control_list],
+            )
+            for name, target_index_list, control_list in signatures
+        )
+        model = CircuitData.from_gate_stream(gates, circuit.get_qubit_count())
+        grid = model.gates
+        assert isinstance(grid, GateGrid)
+        grid.table = tuple(grid.table)
+        for array in (grid.ids, grid.layers):
+            array.flags.writeable = False
+        conversion_cache.put(key, model)
+    return dataclasses.replace(model)
+
+
+def to_models(
+    circuits: Sequence[QuantumCircuit],
+    *,
+    workers: Optional[int] = None,
+    chunksize: int = 16,
+    serial_threshold: int = 64,
+) -> List[CircuitData]:
+    """
+    Convert many qulacs circuits to CircuitData models in a process pool.
+
+    Circuits are sent to the worker processes with qulacs' own pickle support,
+    and the converted models are sent back in the order of ``circuits``.
+    The conversion cache is not used.
+
+    Parameters
+    ----------
+    circuits : Sequence[QuantumCircuit]
+        The circuits to be converted.
+    workers : int optional
+        The number of worker processes. If None, the number of CPUs is used.
+    chunksize : int optional default=16
+        The number of circuits sent to a worker at once.
+    serial_threshold : int optional default=64
+        If fewer circuits are given, or ``workers`` is 1, they are converted
+        in this process since starting workers would cost more.
+
+    Returns
+    -------
+    List[CircuitData]
+        The converted models in the order of ``circuits``.
+
+    Examples
+    --------
+    >>> circuits = [create_qcl_ansatz(8, depth, 1.0)._circuit for depth in range(1000)]
+    >>> models = to_models(circuits, workers=8)
+    """
+    if len(circuits) < serial_threshold or workers == 1:
+        return [_convert(circuit) for circuit in circuits]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_convert, circuits, chunksize=chunksize))
+
+
+def _convert(circuit: QuantumCircuit) -> CircuitData:
+    gates = (
+        to_gate_data(circuit.get_gate(position))
+        for position in range(circuit.get_gate_count())
+    )
+    return CircuitData.from_gate_stream(gates, circuit.get_qubit_count())
+
+
+def _gate_signatures(circuit: QuantumCircuit) -> Tuple[GateSignature, ...]:
+    signatures = []
     for position in range(circuit.get_gate_count()):
         gate = circuit.get_gate(position)
-        target_index_list = gate.get_target_index_list()
-        control_index_value_list = [
-            ControlQubitInfo(index, control_value)
-            for index, control_value in gate.get_control_index_value_list()
-        ]
-        gate_name = gate.get_name()
-        gates.append(GateData(gate_name, target_index_list, control_index_value_list))
-
-    return CircuitData.from_gate_sequence(gates, qubit_count)
+        signatures.append(
+            (
+                gate.get_name(),
+                tuple(gate.get_target_index_list()),
+                tuple(gate.get_control_index_value_list()),
+            )
+        )
+    return tuple(signatures)
+
+
+def update_model(builder: CircuitDataBuilder, circuit: QuantumCircuit) -> CircuitData:
+    """
+    Append the gates added to a circuit since the last update to a builder.
+
+    Only the gates from ``builder.gate_count`` to the end of the circuit are
+    converted, so the circuit must only have gates appended between updates.
+
+    Parameters
+    ----------
+    builder : CircuitDataBuilder
+        The builder holding the gates of the circuit converted so far.
+    circuit : QuantumCircuit
+        The circuit to which gates have been appended.
+
+    Returns
+    -------
+    CircuitData
+        The snapshot of the builder after the update.
+
+    Raises
+    ------
+    ValueError
+        If the circuit has fewer gates or a different number of qubits
+        from the builder.
+
+    Examples
+    --------
+    >>> circuit = QuantumCircuit(2)
+    >>> builder = CircuitDataBuilder(circuit.get_qubit_count())
+    >>> for _ in range(10):
+    >>>     circuit.add_H_gate(0)
+    >>>     circuit.add_CNOT_gate(0, 1)
+    >>>     drawer = MPLCircuitlDrawer(update_model(builder, circuit))
+    """
+    if circuit.get_qubit_count() != builder.qubit_count:
+        raise ValueError("The circuit and the builder have different qubit counts.")
+    gate_count = circuit.get_gate_count()
+    if gate_count < builder.gate_count:
+        raise ValueError("Gates have been removed from the circuit since the update.")
+
+    builder.extend(
+        to_gate_data(circuit.get_gate(position))
+        for position in range(builder.gate_count, gate_count)
+    )
+    return builder.snapshot()
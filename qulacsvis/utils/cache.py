@@ -0,0 +1,330 @@
+import contextlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Generic,
+    Hashable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+_K = TypeVar("_K", bound=Hashable)
+_V = TypeVar("_V")
+
+_TMP_SUFFIX = ".tmp"
+# Temporary files older than this (in seconds) are left by crashed writers.
+_STALE_TMP_SECONDS = 60 * 60
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        """The ratio of hits to lookups, or 0.0 if there have been no lookups."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LRUCache(Generic[_K, _V]):
+    """
+    Thread-safe LRU cache with hit, miss and eviction statistics.
+
+    Parameters
+    ----------
+    maxsize : int
+        The maximum number of cached values.
+        The least recently used value is evicted when it is exceeded.
+    """
+
+    def __init__(self, maxsize: int):
+        self._maxsize = maxsize
+        self._values: "OrderedDict[_K, _V]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: _K) -> Optional[_V]:
+        """
+        Get a cached value and mark it as recently used.
+
+        Parameters
+        ----------
+        key : Hashable
+            The key of the value.
+
+        Returns
+        -------
+        Optional[V]
+            The cached value, or None if it is not cached.
+        """
+        with self._lock:
+            value = self._values.get(key)
+            if value is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._values.move_to_end(key)
+            return value
+
+    def put(self, key: _K, value: _V) -> None:
+        """
+        Cache a value.
+
+        Parameters
+        ----------
+        key : Hashable
+            The key of the value.
+        value : V
+            The value to be cached.
+        """
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            self._evict(self._maxsize)
+
+    def resize(self, maxsize: int) -> None:
+        """
+        Change the maximum number of cached values.
+
+        Parameters
+        ----------
+        maxsize : int
+            The new maximum number of cached values.
+        """
+        with self._lock:
+            self._maxsize = maxsize
+            self._evict(maxsize)
+
+    def clear(self) -> None:
+        """
+        Remove all cached values and reset the statistics.
+        """
+        with self._lock:
+            self._values.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def info(self) -> CacheInfo:
+        """
+        Get the statistics of the cache.
+
+        Returns
+        -------
+        CacheInfo
+            The numbers of hits, misses and evictions, and the size of the cache.
+        """
+        with self._lock:
+            return CacheInfo(
+                self._hits,
+                self._misses,
+                self._evictions,
+                self._maxsize,
+                len(self._values),
+            )
+
+    def _evict(self, maxsize: int) -> None:
+        while len(self._values) > max(maxsize, 0):
+            self._values.popitem(last=False)
+            self._evictions += 1
+
+
+class DiskCache:
+    """
+    Size-capped LRU cache of bytes stored as files in a directory.
+
+    Each value is stored in a file named after its key, so processes sharing
+    the directory share the cache. Values are written to a temporary file and
+    moved into place with ``os.replace``, so a reader sees either the whole
+    value or no value. Reading a value updates the modification time of its
+    file, and the least recently used files are removed when the total size
+    exceeds ``max_bytes``. Statistics are counted per instance.
+
+    The total size is counted once when the cache is opened and then tracked on
+    each ``put``. The directory is scanned again only when the tracked size
+    exceeds ``max_bytes``, which also counts the values stored by the other
+    processes. Temporary files left by writers which crashed are removed
+    when the directory is scanned.
+
+    Parameters
+    ----------
+    directory : str or os.PathLike
+        The directory to store the values in. It is created if it does not exist,
+        and "~" is expanded to the home directory.
+    max_bytes : int optional default=64 MiB
+        The maximum total size of the stored values in bytes.
+    """
+
+    def __init__(
+        self, directory: Union[str, "os.PathLike[str]"], max_bytes: int = 64 << 20
+    ):
+        self._directory = os.path.expanduser(os.fspath(directory))
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        os.makedirs(self._directory, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._scan())
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Read a stored value and mark it as recently used.
+
+        Parameters
+        ----------
+        key : str
+            The key of the value, which must be usable as a file name.
+
+        Returns
+        -------
+        Optional[bytes]
+            The stored value, or None if it is not stored.
+        """
+        path = self._path(key)
+        value: Optional[bytes] = None
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            # The file may be evicted by another process after it is read.
+            pass
+        with self._lock:
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return value
+
+    def put(self, key: str, value: bytes) -> None:
+        """
+        Store a value, evicting the least recently used values if needed.
+
+        Parameters
+        ----------
+        key : str
+            The key of the value, which must be usable as a file name.
+        value : bytes
+            The value to be stored.
+        """
+        path = self._path(key)
+        try:
+            replaced_size = os.stat(path).st_size
+        except FileNotFoundError:
+            replaced_size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix=_TMP_SUFFIX)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._size += len(value) - replaced_size
+            over_budget = self._size > self._max_bytes
+        if over_budget:
+            self._evict(self._max_bytes)
+
+    def resize(self, max_bytes: int) -> None:
+        """
+        Change the maximum total size of the stored values.
+
+        Parameters
+        ----------
+        max_bytes : int
+            The new maximum total size in bytes.
+        """
+        self._max_bytes = max_bytes
+        self._evict(max_bytes)
+
+    def clear(self) -> None:
+        """
+        Remove all stored values and reset the statistics.
+        """
+        for _, _, path in self._scan():
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+        with self._lock:
+            self._hits = self._misses = self._evictions = 0
+            self._size = 0
+
+    def info(self) -> CacheInfo:
+        """
+        Get the statistics of the cache.
+
+        Returns
+        -------
+        CacheInfo
+            The numbers of hits, misses and evictions of this instance.
+            ``maxsize`` and ``currsize`` are the maximum and current total sizes
+            of the stored values in bytes.
+        """
+        currsize = sum(size for _, size, _ in self._scan())
+        with self._lock:
+            return CacheInfo(
+                self._hits, self._misses, self._evictions, self._max_bytes, currsize
+            )
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, key)
+
+    def _scan(self) -> List[Tuple[int, int, str]]:
+        """
+        List the (mtime in ns, size, path) of the stored files,
+        removing the stale temporary files.
+        """
+        files = []
+        stale_before = time.time() - _STALE_TMP_SECONDS
+        with os.scandir(self._directory) as entries:
+            for entry in entries:
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if not entry.name.endswith(_TMP_SUFFIX):
+                    files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                elif stat.st_mtime < stale_before:
+                    # A live writer would have moved it into place by now.
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(entry.path)
+        return files
+
+    def _evict(self, max_bytes: int) -> None:
+        files = self._scan()
+        total = sum(size for _, size, _ in files)
+        if total > max_bytes:
+            files.sort()
+            for _, size, path in files:
+                if total <= max(max_bytes, 0):
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    # Another process has evicted it.
+                    pass
+                else:
+                    with self._lock:
+                        self._evictions += 1
+                total -= size
+        with self._lock:
+            self._size = total
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Sequence
 
 __DEFAULT_GATESTR_MAP = {
     "": "",
@@ -87,13 +87,13 @@ def to_latex_style(gate_name: str) -> str:
     return __TO_LATEX_STYLE_GATESTR_MAP[gate_name]
 
 
-def grouping_adjacent_gates(target_bits: List[int]) -> List[List[int]]:
+def grouping_adjacent_gates(target_bits: Sequence[int]) -> List[List[int]]:
     """
     Grouping adjacent gates.
 
     Parameters
     ----------
-    target_bit : List[int]
+    target_bit : Sequence[int]
         The target bit list.
 
     Returns
@@ -108,10 +108,9 @@ def grouping_adjacent_gates(target_bits: List[int]) -> List[List[int]]:
     >>> [[1, 2, 3], [5], [7, 8]]
     """
 
-    target_bits.sort()
     groups = []
     adjacent_gates: List[int] = []
-    for target_bit in target_bits:
+    for target_bit in sorted(target_bits):
         if adjacent_gates == []:
             adjacent_gates.append(target_bit)
             continue
@@ -1,75 +1,396 @@
+import asyncio
+import contextlib
+import hashlib
+import logging
 import os
+import shutil
 import subprocess
+import tempfile
+import threading
+import weakref
+from concurrent.futures import Executor
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def run_process_async(
+    args: List[str],
+    *,
+    env: Optional[Dict[str, str]] = None,
+    separate_stderr: bool = False,
+) -> bytes:
+    """
+    Run a command with ``asyncio.create_subprocess_exec``.
+
+    If the awaiting task is cancelled, e.g., by ``asyncio.wait_for``,
+    the process is killed and reaped before the cancellation is propagated.
+
+    Parameters
+    ----------
+    args : List[str]
+        The command and its arguments.
+    env : Optional[Dict[str, str]] optional default=None
+        The environment variables of the process.
+        If None, the environment of this process is inherited.
+    separate_stderr : bool optional default=False
+        If True, stderr is not merged into stdout, e.g., when stdout is binary.
+        It is only attached to the raised ``subprocess.CalledProcessError``.
+
+    Returns
+    -------
+    bytes
+        The stdout of the command, where stderr is merged unless ``separate_stderr``.
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        If the command exits with a non-zero status.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        env=env,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+        if separate_stderr
+        else asyncio.subprocess.STDOUT,
+    )
+    try:
+        stdout, stderr = await process.communicate()
+    except BaseException:
+        with contextlib.suppress(ProcessLookupError):
+            process.kill()
+        await process.wait()
+        raise
+    if process.returncode:
+        raise subprocess.CalledProcessError(
+            process.returncode, args, output=stdout, stderr=stderr
+        )
+    return stdout
+
+
+def user_cache_dir() -> str:
+    """
+    Get the directory to cache files of qulacsvis in.
+
+    Returns
+    -------
+    str
+        ``$XDG_CACHE_HOME/qulacsvis``, or ``~/.cache/qulacsvis`` if
+        ``XDG_CACHE_HOME`` is not set.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "qulacsvis")
+
+
+class LatexError(Exception):
+    """
+    pdflatex or pdftocairo failed.
+
+    Parameters
+    ----------
+    message : str
+        The description of the error.
+    log : bytes
+        The output of the failed command.
+    """
+
+    def __init__(self, message: str, log: bytes):
+        super().__init__(message)
+        self.log = log
 
 
 class _LatexCompiler:
     """
     Compile latex code to pdf.
+
+    Parameters
+    ----------
+    format_dir : Optional[str] optional default=None
+        The directory to cache the precompiled preambles in.
+        If None, ``user_cache_dir()`` is used.
     """
 
-    def __init__(self) -> None:
+    # Names of the formats dumped or found in this process, keyed by their paths.
+    # None means that the format cannot be used and the preamble is compiled as is.
+    _formats: Dict[str, Optional[str]] = {}
+
+    def __init__(self, format_dir: Optional[str] = None) -> None:
         """
         Initialize the latex compiler.
         """
-        if not self.has_pdflatex():
+        version = self._pdflatex_version()
+        if version is None:
             raise Exception("pdflatex not found.")
+        self._version = version
+        self._format_dir = format_dir if format_dir is not None else user_cache_dir()
 
-    def compile(self, code: str, output_dir: str, filename: str) -> None:
+    def compile(
+        self,
+        code: Union[str, Iterable[str]],
+        output_dir: str,
+        filename: str,
+        *,
+        preamble: Optional[str] = None,
+        error_dir: Optional[str] = ".",
+    ) -> None:
         """
         Compile the latex code.
 
         Parameters
         ----------
-        code : str
+        code : Union[str, Iterable[str]]
             The latex code to compile.
+            An iterable of lines, e.g., ``LatexSourceGenerator.iter_lines()``,
+            is written to the tex file line by line.
         output_dir : str
             The directory to save the pdf file.
         filename : str
             The filename of the latex code (No extension).
+        preamble : Optional[str] optional default=None
+            The preamble of the code, which is everything before ``\\begin{document}``.
+            If given, the preamble is dumped into a format file once with
+            mylatexformat and the code is compiled against it, which skips loading
+            the document class and the packages. If the format cannot be dumped
+            or used, the code is compiled as is.
+        error_dir : Optional[str] optional default="."
+            The directory to save ``latex_error.log`` and ``circuit_drawer.tex``
+            in when pdflatex fails. If None, they are not saved and the log is
+            only attached to the raised ``LatexError``.
+
+        Raises
+        ------
+        LatexError
+            If pdflatex fails.
         """
-        filename_with_ext = filename + ".tex"
-        texfile_path = os.path.join(output_dir, filename_with_ext)
+        filename_with_ext, texfile_path = self._write_tex(code, output_dir, filename)
 
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        format_name = self.dump_format(preamble) if preamble is not None else None
+        if format_name is not None:
+            try:
+                subprocess.run(
+                    **self._pdflatex_command(
+                        output_dir, filename_with_ext, format_name
+                    ),
+                    check=True,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                )
+                return
+            except subprocess.CalledProcessError:
+                # The format may be broken, e.g., by an update of the packages.
+                # The code is compiled without the format to tell whether it is.
+                pass
 
-        with open(texfile_path, "w") as f:
-            f.write(code)
         try:
             subprocess.run(
-                [
-                    "pdflatex",
-                    "-halt-on-error",
-                    "-interaction=nonstopmode",
-                    f"-output-directory={output_dir}",
-                    filename_with_ext,
-                ],
+                **self._pdflatex_command(output_dir, filename_with_ext, None),
                 check=True,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
             )
         except subprocess.CalledProcessError as err:
-            with open("latex_error.log", "wb") as error_file:
-                error_file.write(err.stdout)
-            with open("circuit_drawer.tex", "w") as tex_file:
-                tex_file.write(code)
-            raise Exception(
-                "`pdflatex` failed. See `latex_error.log`, `circuit_drawer.tex`"
-            ) from err
+            raise self._compile_error(err.stdout, texfile_path, error_dir) from err
+
+        if format_name is not None:
+            self._formats[self._format_path(format_name)] = None
+
+    async def compile_async(
+        self,
+        code: Union[str, Iterable[str]],
+        output_dir: str,
+        filename: str,
+        *,
+        preamble: Optional[str] = None,
+        error_dir: Optional[str] = None,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        """
+        Compile the latex code without blocking the event loop.
+
+        pdflatex is run with ``asyncio.create_subprocess_exec``, and the tex file
+        is written in ``executor``. If the task is cancelled, e.g., by a timeout,
+        pdflatex is killed.
+
+        Parameters
+        ----------
+        code, output_dir, filename, preamble
+            Same as ``compile``.
+        error_dir : Optional[str] optional default=None
+            Same as ``compile``. The logs are not saved by default,
+            since concurrent jobs would overwrite each other's logs.
+        executor : Optional[Executor] optional default=None
+            The executor to write the tex file and dump the format in.
+            If None, the default executor of the event loop is used.
+
+        Raises
+        ------
+        LatexError
+            If pdflatex fails.
+        """
+        loop = asyncio.get_running_loop()
+        filename_with_ext, texfile_path = await loop.run_in_executor(
+            executor, self._write_tex, code, output_dir, filename
+        )
+
+        format_name = (
+            await loop.run_in_executor(executor, self.dump_format, preamble)
+            if preamble is not None
+            else None
+        )
+        if format_name is not None:
+            try:
+                await run_process_async(
+                    **self._pdflatex_command(output_dir, filename_with_ext, format_name)
+                )
+                return
+            except subprocess.CalledProcessError:
+                pass
+
+        try:
+            await run_process_async(
+                **self._pdflatex_command(output_dir, filename_with_ext, None)
+            )
+        except subprocess.CalledProcessError as err:
+            raise self._compile_error(err.stdout, texfile_path, error_dir) from err
+
+        if format_name is not None:
+            self._formats[self._format_path(format_name)] = None
+
+    def dump_format(self, preamble: str) -> Optional[str]:
+        """
+        Dump a preamble into a format file in the format directory.
+
+        The format is dumped once per preamble and pdflatex version,
+        and is reused by later compilations and other processes.
+
+        Parameters
+        ----------
+        preamble : str
+            The preamble to be dumped.
+
+        Returns
+        -------
+        Optional[str]
+            The name of the format, or None if it cannot be dumped,
+            e.g., when mylatexformat is not installed.
+        """
+        # A format can only be loaded by the pdflatex which has dumped it.
+        key = hashlib.blake2b(digest_size=8)
+        key.update(self._version.encode())
+        key.update(preamble.encode())
+        format_name = "qulacsvis-" + key.hexdigest()
+        format_path = self._format_path(format_name)
+        if format_path in self._formats:
+            return self._formats[format_path]
+
+        if not os.path.exists(format_path):
+            try:
+                os.makedirs(self._format_dir, exist_ok=True)
+                with tempfile.TemporaryDirectory(dir=self._format_dir) as tmpdir:
+                    with open(os.path.join(tmpdir, "preamble.tex"), "w") as f:
+                        f.write(preamble)
+                        f.write("\n\\begin{document}\n\\end{document}\n")
+                    subprocess.run(
+                        [
+                            "pdflatex",
+                            "-ini",
+                            "-halt-on-error",
+                            "-interaction=nonstopmode",
+                            f"-jobname={format_name}",
+                            "&pdflatex",
+                            "mylatexformat.ltx",
+                            "preamble.tex",
+                        ],
+                        check=True,
+                        cwd=tmpdir,
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL,
+                    )
+                    # Processes dumping the same format replace it with the same one.
+                    os.replace(os.path.join(tmpdir, format_name + ".fmt"), format_path)
+            except (OSError, subprocess.CalledProcessError):
+                self._formats[format_path] = None
+                return None
+
+        self._formats[format_path] = format_name
+        return format_name
+
+    def _format_path(self, format_name: str) -> str:
+        return os.path.join(self._format_dir, format_name + ".fmt")
+
+    def _write_tex(
+        self, code: Union[str, Iterable[str]], output_dir: str, filename: str
+    ) -> Tuple[str, str]:
+        filename_with_ext = filename + ".tex"
+        texfile_path = os.path.join(output_dir, filename_with_ext)
+
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        with open(texfile_path, "w") as f:
+            if isinstance(code, str):
+                f.write(code)
+            else:
+                f.writelines(code)
+        return filename_with_ext, texfile_path
+
+    def _pdflatex_command(
+        self, output_dir: str, filename_with_ext: str, format_name: Optional[str]
+    ) -> Dict[str, Any]:
+        args: List[str] = [
+            "pdflatex",
+            "-halt-on-error",
+            "-interaction=nonstopmode",
+            f"-output-directory={output_dir}",
+        ]
+        env = None
+        if format_name is not None:
+            args.append(f"-fmt={format_name}")
+            # The trailing separator keeps the default search path of formats.
+            env = dict(os.environ, TEXFORMATS=self._format_dir + os.pathsep)
+        return dict(args=args + [filename_with_ext], env=env)
+
+    def _compile_error(
+        self, log: bytes, texfile_path: str, error_dir: Optional[str]
+    ) -> LatexError:
+        if error_dir is None:
+            return LatexError("`pdflatex` failed.", log)
+        with open(os.path.join(error_dir, "latex_error.log"), "wb") as error_file:
+            error_file.write(log)
+        shutil.copyfile(texfile_path, os.path.join(error_dir, "circuit_drawer.tex"))
+        return LatexError(
+            "`pdflatex` failed. See `latex_error.log`, `circuit_drawer.tex`", log
+        )
 
     def has_pdflatex(self) -> bool:
         """
         Check if latex is installed.
         """
+        return self._pdflatex_version() is not None
+
+    def _pdflatex_version(self) -> Optional[str]:
         try:
-            subprocess.run(
+            result = subprocess.run(
                 ["pdflatex", "--version"],
-                stdout=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
                 stderr=subprocess.DEVNULL,
             )
-            return True
         except FileNotFoundError:
-            return False
+            return None
+        return result.stdout.decode(errors="replace").partition("\n")[0]
 
 
 class _PDFtoImage:
@@ -84,7 +405,9 @@ class _PDFtoImage:
         if not self.has_pdftocairo():
             raise Exception("pdftocairo not found.")
 
-    def convert(self, filename: str, *, ppi: int = 150) -> None:
+    def convert(
+        self, filename: str, *, ppi: int = 150, error_dir: Optional[str] = "."
+    ) -> None:
         """
         Convert the pdf to image.
         <filename>.pdf -> <filename>.png
@@ -95,31 +418,130 @@ class _PDFtoImage:
             The filename of the pdf file (No extension).
         ppi : int
             The pixels per inch of the output image.
+        error_dir : Optional[str] optional default="."
+            The directory to save ``pdftocairo_error.log`` in when pdftocairo fails.
+            If None, the log is only attached to the raised ``LatexError``.
         """
-        pdf_path = filename + ".pdf"
+        self._run(["-singlefile"], filename, ppi, error_dir)
 
-        if not os.path.exists(pdf_path):
-            raise Exception("pdf file not found.")
+    def convert_pages(
+        self, filename: str, *, ppi: int = 150, error_dir: Optional[str] = "."
+    ) -> List[str]:
+        """
+        Convert every page of the pdf to an image in one pdftocairo run.
+        <filename>.pdf -> <filename>-<page>.png
+
+        Parameters
+        ----------
+        filename : str
+            The filename of the pdf file (No extension).
+        ppi : int
+            The pixels per inch of the output images.
+        error_dir : Optional[str] optional default="."
+            Same as ``convert``.
 
+        Returns
+        -------
+        List[str]
+            The paths of the images in the order of the pages.
+        """
+        self._run([], filename, ppi, error_dir)
+        # pdftocairo pads the page numbers to the number of digits of the last page.
+        prefix = os.path.basename(filename) + "-"
+        pages = []
+        for entry in os.listdir(os.path.dirname(filename) or "."):
+            page, ext = os.path.splitext(entry[len(prefix) :])
+            if entry.startswith(prefix) and ext == ".png" and page.isdigit():
+                pages.append(
+                    (int(page), os.path.join(os.path.dirname(filename), entry))
+                )
+        return [path for _, path in sorted(pages)]
+
+    def convert_to_bytes(
+        self, filename: str, *, ppi: int = 150, error_dir: Optional[str] = "."
+    ) -> bytes:
+        """
+        Convert the pdf to a PNG image in memory.
+        pdftocairo writes the image to its stdout, so no image file is written.
+
+        Parameters
+        ----------
+        filename, ppi, error_dir
+            Same as ``convert``.
+
+        Returns
+        -------
+        bytes
+            The encoded PNG image.
+        """
+        command = self._command(["-singlefile"], filename, ppi, output="-")
+        try:
+            result = subprocess.run(
+                **command,
+                check=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        except subprocess.CalledProcessError as err:
+            raise self._convert_error(err.stderr, error_dir) from err
+        png: bytes = result.stdout
+        return png
+
+    async def convert_to_bytes_async(
+        self, filename: str, *, ppi: int = 150, error_dir: Optional[str] = None
+    ) -> bytes:
+        """
+        Same as ``convert_to_bytes`` without blocking the event loop.
+
+        pdftocairo is run with ``asyncio.create_subprocess_exec``.
+        If the task is cancelled, e.g., by a timeout, pdftocairo is killed.
+        The log is not saved unless ``error_dir`` is given,
+        since concurrent jobs would overwrite each other's logs.
+        """
+        command = self._command(["-singlefile"], filename, ppi, output="-")
+        try:
+            return await run_process_async(**command, separate_stderr=True)
+        except subprocess.CalledProcessError as err:
+            raise self._convert_error(err.stderr, error_dir) from err
+
+    def _run(
+        self, options: List[str], filename: str, ppi: int, error_dir: Optional[str]
+    ) -> None:
+        command = self._command(options, filename, ppi)
         try:
             subprocess.run(
-                [
-                    "pdftocairo",
-                    "-singlefile",
-                    "-png",
-                    "-r",
-                    f"{ppi}",
-                    pdf_path,
-                    filename,
-                ],
+                **command,
                 check=True,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
             )
         except subprocess.CalledProcessError as err:
-            with open("pdftocairo_error.log", "wb") as error_file:
-                error_file.write(err.stdout)
-            raise Exception("`pdftocairo` failed. See `pdftocairo_error.log`") from err
+            raise self._convert_error(err.stdout, error_dir) from err
+
+    def _command(
+        self,
+        options: List[str],
+        filename: str,
+        ppi: int,
+        output: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        pdf_path = filename + ".pdf"
+
+        if not os.path.exists(pdf_path):
+            raise Exception("pdf file not found.")
+
+        # The output "-" is stdout.
+        output = filename if output is None else output
+        return dict(
+            args=["pdftocairo", *options, "-png", "-r", f"{ppi}", pdf_path, output]
+        )
+
+    def _convert_error(self, log: bytes, error_dir: Optional[str]) -> LatexError:
+        if error_dir is None:
+            return LatexError("`pdftocairo` failed.", log)
+        with open(os.path.join(error_dir, "pdftocairo_error.log"), "wb") as error_file:
+            error_file.write(log)
+        return LatexError("`pdftocairo` failed. See `pdftocairo_error.log`", log)
 
     def has_pdftocairo(self) -> bool:
         """
@@ -134,3 +556,163 @@ class _PDFtoImage:
             return True
         except FileNotFoundError:
             return False
+
+
+class LatexSession:
+    """
+    Long-lived LaTeX toolchain with reusable scratch directories.
+
+    pdflatex and pdftocairo are probed once when the session is created.
+    Each job borrows a scratch directory from ``workspace()``. The directory
+    is emptied when the job ends and lent to the next job, so it is not
+    created and deleted for every drawing. A directory which cannot be
+    emptied is deleted instead, and the failure is logged. Jobs running at
+    the same time get different directories. The directories are placed in
+    ``/dev/shm`` if it is available, and are deleted when the session is
+    closed or collected.
+
+    Parameters
+    ----------
+    scratch_dir : Optional[str] optional default=None
+        The directory to create the scratch directories in.
+        If None, ``/dev/shm`` is used if it is writable, and otherwise
+        the default temporary directory.
+    format_dir : Optional[str] optional default=None
+        Same as ``_LatexCompiler``.
+
+    Attributes
+    ----------
+    latex : _LatexCompiler
+        The latex compiler shared by the jobs.
+    pdftoimage : _PDFtoImage
+        The pdf to image converter shared by the jobs.
+
+    Examples
+    --------
+    >>> with LatexSession() as session:
+    >>>     for circuit in circuits:
+    >>>         circuit_drawer(circuit, "latex", session=session)
+    """
+
+    def __init__(
+        self, scratch_dir: Optional[str] = None, format_dir: Optional[str] = None
+    ) -> None:
+        self.latex = _LatexCompiler(format_dir=format_dir)
+        self.pdftoimage = _PDFtoImage()
+        if scratch_dir is None and os.access("/dev/shm", os.W_OK | os.X_OK):
+            scratch_dir = "/dev/shm"
+        self._root = tempfile.mkdtemp(prefix="qulacsvis-", dir=scratch_dir)
+        self._free: List[str] = []
+        self._workspace_count = 0
+        self._lock = threading.Lock()
+        self._finalizer = weakref.finalize(
+            self, shutil.rmtree, self._root, ignore_errors=True
+        )
+
+    @contextlib.contextmanager
+    def workspace(self) -> Iterator[str]:
+        """
+        Borrow an empty scratch directory for a job.
+
+        Yields
+        ------
+        str
+            The path of the directory. It is emptied when the job ends.
+        """
+        path = self._acquire()
+        try:
+            yield path
+        finally:
+            self._release(path)
+
+    @contextlib.asynccontextmanager
+    async def workspace_async(
+        self, executor: Optional[Executor] = None
+    ) -> AsyncIterator[str]:
+        """
+        Same as ``workspace``, emptying the directory in an executor.
+
+        Parameters
+        ----------
+        executor : Optional[Executor] optional default=None
+            The executor to empty the directory in.
+            If None, the default executor of the event loop is used.
+
+        Yields
+        ------
+        str
+            The path of the directory. It is emptied when the job ends.
+        """
+        path = self._acquire()
+        try:
+            yield path
+        finally:
+            loop = asyncio.get_running_loop()
+            # Shielded, so that a cancellation does not skip the cleanup.
+            await asyncio.shield(loop.run_in_executor(executor, self._release, path))
+
+    def _acquire(self) -> str:
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+            path = os.path.join(self._root, str(self._workspace_count))
+            self._workspace_count += 1
+            os.mkdir(path)
+            return path
+
+    def _release(self, path: str) -> None:
+        # This runs when a job ends, so it must not raise
+        # and replace the exception of the job.
+        try:
+            _clear_directory(path)
+        except Exception:
+            # A directory which cannot be emptied is not lent again.
+            logger.warning("Failed to empty %s; removing it.", path, exc_info=True)
+            shutil.rmtree(path, ignore_errors=True)
+            return
+        with self._lock:
+            self._free.append(path)
+
+    def close(self) -> None:
+        """
+        Delete the scratch directories.
+        """
+        self._finalizer()
+
+    def __enter__(self) -> "LatexSession":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+_default_session: Optional[LatexSession] = None
+_default_session_lock = threading.Lock()
+
+
+def default_session() -> LatexSession:
+    """
+    Get the session shared by the drawings which are not given a session.
+
+    The session is created at the first call, which raises an exception
+    if pdflatex or pdftocairo is not found, and is reused afterwards.
+
+    Returns
+    -------
+    LatexSession
+        The shared session.
+    """
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = LatexSession()
+        return _default_session
+
+
+def _clear_directory(path: str) -> None:
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.remove(entry.path)
@@ -1,5 +1,11 @@
-from .circuit_drawer import circuit_drawer  # noqa
+from .circuit_drawer import (  # noqa
+    LatexResult,
+    circuit_drawer,
+    circuit_drawer_async,
+    render_latex_batch,
+    render_latex_parallel,
+)
 from .circuit_parser import CircuitParser  # noqa
 from .latex import LatexSourceGenerator  # noqa
 from .matplotlib import MPLCircuitlDrawer  # noqa
-from .text import TextCircuitDrawer  # noqa
+from .text import CompactTextCircuitDrawer, TextCircuitDrawer  # noqa
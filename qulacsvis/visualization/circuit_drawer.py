@@ -1,52 +1,98 @@
+import asyncio
+import functools
+import hashlib
+import io
+import itertools
 import os
-import shutil
-import tempfile
-from typing import Optional, Union
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import matplotlib  # NOQA
 from PIL import Image
 from qulacs import QuantumCircuit
 
-from qulacsvis.utils.latex import _LatexCompiler, _PDFtoImage
+from qulacsvis.models.circuit import CircuitData
+from qulacsvis.utils.cache import DiskCache
+from qulacsvis.utils.latex import LatexSession, default_session
 
+from .._version import __version__
 from ..qulacs.circuit import to_model
-from .latex import LatexSourceGenerator
+from .latex import LatexSourceGenerator, batch_preamble, iter_batch_lines
 from .matplotlib import MPLCircuitlDrawer
-from .text import TextCircuitDrawer
+from .text import CompactTextCircuitDrawer, TextCircuitDrawer, _draw_lines
 
 
 def circuit_drawer(
-    circuit: QuantumCircuit,
+    circuit: Union[QuantumCircuit, CircuitData],
     output_method: Optional[str] = None,
     *,
     verbose: bool = False,
     filename: Optional[str] = None,
     dot: str = "large",
+    compact: bool = False,
+    layers: Optional[Tuple[int, int]] = None,
+    qubits: Optional[Tuple[int, int]] = None,
     ppi: int = 150,
     dpi: int = 72,
     scale: float = 0.6,
-) -> Union[str, Image.Image, matplotlib.figure.Figure]:
+    cache: Optional[DiskCache] = None,
+    return_bytes: bool = False,
+    session: Optional[LatexSession] = None,
+) -> Union[str, bytes, Image.Image, matplotlib.figure.Figure]:
 
     """
     Draws a circuit diagram of a circuit.
 
     Parameters
     ----------
-    circuit : qulacs.QuantumCircuit
+    circuit : Union[qulacs.QuantumCircuit, CircuitData]
         The quantum circuit to be drawn.
+        A qulacs circuit is converted to CircuitData once and the model is
+        passed to the drawer, so a CircuitData loaded from JSON or the binary
+        format can be drawn without qulacs.
     output_method : Optional[str], optional
         Set the output method for the drawn circuit.
         If None, the output method is set to 'text'.
     verbose : bool optional default=False
-        (output_method='text')
+        (output_method='text' or 'text_source')
         If True, a number will be added to the gate.
         Gates are numbered in the order in which they are added to the circuit.
     filename : Optional[str] optional default=None
-        (output_method='mpl' or 'latex')
-        File name to save the drawing image
+        (output_method='text', 'mpl' or 'latex')
+        File name to save the drawing image.
+        For output_method='text', the diagram is saved without folding.
     dot: str optional default='large'
-        (output_method='text')
+        (output_method='text' or 'text_source')
         Dot style to mean control qubit(default="large")
+    compact : bool optional default=False
+        (output_method='text' or 'text_source')
+        If True, draw each qubit in one line and each layer in 4 characters.
+        Gates are drawn with their abbreviations and gate numbers are not drawn.
+    layers : Optional[Tuple[int, int]] optional default=None
+        (output_method='text' or 'text_source')
+        Draw only the layers from ``layers[0]`` up to ``layers[1]`` (exclusive).
+        Wires continuing outside the window end with "...".
+    qubits : Optional[Tuple[int, int]] optional default=None
+        (output_method='text' or 'text_source')
+        Draw only the qubits from ``qubits[0]`` up to ``qubits[1]`` (exclusive).
     ppi : int optional default=150
         (output_method='latex')
         The pixels per inch of the output image.
@@ -56,13 +102,29 @@ def circuit_drawer(
     scale : float optional default=0.6
         (output_method='mpl')
         The scale of the output image.
+    cache : Optional[DiskCache] optional default=None
+        (output_method='text', 'text_source', 'latex' or 'latex_source')
+        If given, the output is looked up in and stored to the cache, keyed by
+        ``CircuitData.digest()``, the output method and the options affecting it.
+        Text and LaTeX sources are stored as UTF-8 and latex images as PNG.
+        The output of 'mpl' is a live figure, so it is not cached.
+    return_bytes : bool optional default=False
+        (output_method='latex')
+        If True, the encoded PNG image is returned as bytes without decoding it,
+        e.g., to be sent in an HTTP response.
+    session : Optional[LatexSession] optional default=None
+        (output_method='latex')
+        The LaTeX toolchain and the scratch directory to draw with.
+        If None, the session shared in the process, ``default_session()``, is used.
 
     Returns
     -------
-    Union[str, Image.Image, None]
+    Union[str, bytes, Image.Image, None]
         The output of the circuit drawer.
         If output_method is 'text', the output is a None. Circuit is output to stdout.
-        If output_method is 'latex', the output is an Image.Image object.
+        If output_method is 'text_source', the output is a string without folding.
+        If output_method is 'latex', the output is an Image.Image object,
+        or the PNG image as bytes if return_bytes is True.
         If output_method is 'latex_source', the output is a string.
         If output_method is 'mpl', the output is a None.
         Circuit is drawn to a matplotlib figure.
@@ -70,7 +132,7 @@ def circuit_drawer(
     Raises
     ------
     ValueError
-        If output_method is not 'text', 'latex', 'latex_source', or 'mpl'.
+        If output_method is not 'text', 'text_source', 'latex', 'latex_source', or 'mpl'.
 
     Examples
     --------
@@ -103,37 +165,447 @@ def circuit_drawer(
     if output_method is None:
         output_method = "text"
 
-    if output_method == "text":
-        text_drawer = TextCircuitDrawer(circuit, dot=dot)
-        text_drawer.draw(verbose=verbose)
+    if not isinstance(circuit, CircuitData):
+        circuit = to_model(circuit)
+
+    if output_method in ("text", "text_source"):
+        text_options = dict(
+            verbose=verbose, dot=dot, compact=compact, layers=layers, qubits=qubits
+        )
+
+        def render_text() -> bytes:
+            text_drawer_class = (
+                CompactTextCircuitDrawer if compact else TextCircuitDrawer
+            )
+            text_drawer = text_drawer_class(
+                circuit, dot=dot, layers=layers, qubits=qubits
+            )
+            return text_drawer.render(verbose=verbose).encode("utf-8")
+
+        # Both methods store the unfolded diagram, so they share the entries.
+        text = _cached(cache, circuit, "text", text_options, render_text).decode(
+            "utf-8"
+        )
+        if output_method == "text_source":
+            return text
+
+        _draw_lines(text.split("\n")[:-1])
+        if filename:
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write(text)
         return None
 
     elif output_method == "latex":
-        with tempfile.TemporaryDirectory() as tmpdir:
-            generator = LatexSourceGenerator(to_model(circuit))
-            latex_source = generator.generate()
-            latex = _LatexCompiler()
-            pdftoimage = _PDFtoImage()
 
-            latex.compile(latex_source, tmpdir, "circuit_drawer")
-            pdftoimage.convert(os.path.join(tmpdir, "circuit_drawer"), ppi=ppi)
+        def render_latex() -> bytes:
+            latex_session = session if session is not None else default_session()
+            return _render_latex_png(circuit, ppi, latex_session)
 
-            if filename:
-                shutil.copyfile(os.path.join(tmpdir, "circuit_drawer.png"), filename)
+        png = _cached(cache, circuit, "latex", dict(ppi=ppi), render_latex)
+        if filename:
+            _write_bytes(filename, png)
 
-            image = Image.open(os.path.join(tmpdir, "circuit_drawer.png"))
-            return image
+        if return_bytes:
+            return png
+        image = _decode_png(png)
+        return image
 
     elif output_method == "latex_source":
-        generator = LatexSourceGenerator(to_model(circuit))
-        latex_source = generator.generate()
+
+        def render_latex_source() -> bytes:
+            generator = LatexSourceGenerator(circuit)
+            return generator.generate().encode("utf-8")
+
+        latex_source = _cached(
+            cache, circuit, "latex_source", {}, render_latex_source
+        ).decode("utf-8")
         return latex_source
 
     elif output_method == "mpl":
-        mpl_drawer = MPLCircuitlDrawer(to_model(circuit), dpi=dpi, scale=scale)
+        mpl_drawer = MPLCircuitlDrawer(circuit, dpi=dpi, scale=scale)
         return mpl_drawer.draw(filename=filename)
 
     else:
         raise ValueError(
-            "Invalid output_method. Valid options are: 'text', 'latex', 'latex_source', 'mpl'."
+            "Invalid output_method. Valid options are: "
+            "'text', 'text_source', 'latex', 'latex_source', 'mpl'."
+        )
+
+
+async def circuit_drawer_async(
+    circuit: Union[QuantumCircuit, CircuitData],
+    output_method: Optional[str] = None,
+    *,
+    verbose: bool = False,
+    filename: Optional[str] = None,
+    dot: str = "large",
+    compact: bool = False,
+    layers: Optional[Tuple[int, int]] = None,
+    qubits: Optional[Tuple[int, int]] = None,
+    ppi: int = 150,
+    dpi: int = 72,
+    scale: float = 0.6,
+    cache: Optional[DiskCache] = None,
+    return_bytes: bool = False,
+    session: Optional[LatexSession] = None,
+    timeout: Optional[float] = None,
+    executor: Optional[Executor] = None,
+) -> Union[str, bytes, Image.Image, matplotlib.figure.Figure]:
+    """
+    Draws a circuit diagram of a circuit without blocking the event loop.
+
+    For output_method='latex', pdflatex and pdftocairo are run with
+    ``asyncio.create_subprocess_exec``, and the conversion of the circuit and
+    the generation of the latex source are run in ``executor``.
+    The other output methods are drawn by ``circuit_drawer`` in ``executor``.
+
+    If the task is cancelled or ``timeout`` expires, running pdflatex and
+    pdftocairo are killed. Drawing in ``executor`` cannot be interrupted and
+    runs to completion in the background, but its result is discarded.
+
+    Parameters
+    ----------
+    circuit, output_method, verbose, filename, dot, compact, layers, qubits,
+    ppi, dpi, scale, cache, return_bytes, session
+        Same as ``circuit_drawer``.
+    timeout : Optional[float] optional default=None
+        The time limit of the drawing in seconds. If None, there is no limit.
+    executor : Optional[Executor] optional default=None
+        The executor to run CPU-bound work in.
+        If None, the default executor of the event loop is used.
+        For output_method='mpl', use a non-interactive backend such as Agg,
+        since the figure is created outside the main thread.
+
+    Returns
+    -------
+    Union[str, bytes, Image.Image, None]
+        Same as ``circuit_drawer``.
+
+    Raises
+    ------
+    asyncio.TimeoutError
+        If the drawing does not complete in ``timeout`` seconds.
+    ValueError
+        If output_method is not 'text', 'text_source', 'latex', 'latex_source', or 'mpl'.
+
+    Examples
+    --------
+    >>> async def handle(circuit: QuantumCircuit) -> bytes:
+    >>>     return await circuit_drawer_async(
+    >>>         circuit, "latex", return_bytes=True, timeout=10.0
+    >>>     )
+    """
+    loop = asyncio.get_running_loop()
+
+    async def draw() -> Union[str, bytes, Image.Image, matplotlib.figure.Figure]:
+        if output_method != "latex":
+            return await loop.run_in_executor(
+                executor,
+                functools.partial(
+                    circuit_drawer,
+                    circuit,
+                    output_method,
+                    verbose=verbose,
+                    filename=filename,
+                    dot=dot,
+                    compact=compact,
+                    layers=layers,
+                    qubits=qubits,
+                    dpi=dpi,
+                    scale=scale,
+                    cache=cache,
+                ),
+            )
+
+        model = (
+            circuit
+            if isinstance(circuit, CircuitData)
+            else await loop.run_in_executor(executor, to_model, circuit)
+        )
+        png: Optional[bytes] = None
+        if cache is not None:
+            key = await loop.run_in_executor(
+                executor, _cache_key, model, "latex", dict(ppi=ppi)
+            )
+            png = await loop.run_in_executor(executor, cache.get, key)
+        if png is None:
+            latex_session = (
+                session
+                if session is not None
+                else await loop.run_in_executor(executor, default_session)
+            )
+            png = await _render_latex_png_async(model, ppi, latex_session, executor)
+            if cache is not None:
+                await loop.run_in_executor(executor, cache.put, key, png)
+        if filename:
+            await loop.run_in_executor(executor, _write_bytes, filename, png)
+
+        if return_bytes:
+            return png
+        return await loop.run_in_executor(executor, _decode_png, png)
+
+    return await asyncio.wait_for(draw(), timeout)
+
+
+def render_latex_batch(
+    circuits: Sequence[Union[QuantumCircuit, CircuitData]],
+    *,
+    ppi: int = 150,
+    session: Optional[LatexSession] = None,
+) -> List[Image.Image]:
+    """
+    Draws many circuits with LaTeX at once.
+
+    The circuits are drawn on the pages of one document, which is compiled by
+    one pdflatex run and converted to images by one pdftocairo run.
+    This saves the start-up of the processes and the preamble per circuit
+    compared to calling ``circuit_drawer(output_method='latex')`` for each.
+
+    Parameters
+    ----------
+    circuits : Sequence[Union[qulacs.QuantumCircuit, CircuitData]]
+        The quantum circuits to be drawn.
+    ppi : int optional default=150
+        The pixels per inch of the output images.
+    session : Optional[LatexSession] optional default=None
+        Same as ``circuit_drawer``.
+
+    Returns
+    -------
+    List[Image.Image]
+        The images of the circuits in the order of ``circuits``.
+        Each image is the same as the output of ``circuit_drawer``.
+
+    Examples
+    --------
+    >>> from qulacsvis.visualization import render_latex_batch
+    >>> circuits = [create_qcl_ansatz(4, depth, 1.0)._circuit for depth in range(100)]
+    >>> images = render_latex_batch(circuits, ppi=150)
+    >>> for i, image in enumerate(images):
+    >>>     image.save(f"circuit_{i}.png")
+    """
+    models = [
+        circuit if isinstance(circuit, CircuitData) else to_model(circuit)
+        for circuit in circuits
+    ]
+    if not models:
+        return []
+
+    if session is None:
+        session = default_session()
+    with session.workspace() as tmpdir:
+        session.latex.compile(
+            iter_batch_lines(models),
+            tmpdir,
+            "circuit_drawer",
+            preamble=batch_preamble(),
         )
+        pages = session.pdftoimage.convert_pages(
+            os.path.join(tmpdir, "circuit_drawer"), ppi=ppi
+        )
+        if len(pages) != len(models):
+            raise Exception(
+                f"`pdftocairo` made {len(pages)} images of {len(models)} circuits."
+            )
+
+        images: List[Image.Image] = []
+        for page in pages:
+            with open(page, "rb") as png_file:
+                images.append(_decode_png(png_file.read()))
+        return images
+
+
+class LatexResult(NamedTuple):
+    """
+    The result of a job of ``render_latex_parallel``.
+
+    Attributes
+    ----------
+    position : int
+        The position of the circuit in the input.
+    image : Optional[Image.Image]
+        The drawn image, or None if the job failed.
+    error : Optional[BaseException]
+        The exception raised by the job, e.g., ``LatexError`` whose ``log``
+        is the output of pdflatex, or None if the job succeeded.
+    """
+
+    position: int
+    image: Optional[Image.Image]
+    error: Optional[BaseException]
+
+
+def render_latex_parallel(
+    circuits: Iterable[Union[QuantumCircuit, CircuitData]],
+    *,
+    ppi: int = 150,
+    max_in_flight: Optional[int] = None,
+    session: Optional[LatexSession] = None,
+) -> Iterator[LatexResult]:
+    """
+    Draws many circuits with LaTeX, running pdflatex and pdftocairo concurrently.
+
+    Each circuit is a job drawn as by ``circuit_drawer(output_method='latex')``
+    in its own scratch directory. Up to ``max_in_flight`` jobs run at once,
+    and the next circuit is taken from ``circuits`` when a job completes.
+    A failed job does not stop the others. Its error is returned in its result
+    and no log file is written.
+
+    Parameters
+    ----------
+    circuits : Iterable[Union[qulacs.QuantumCircuit, CircuitData]]
+        The quantum circuits to be drawn. It is consumed lazily.
+    ppi : int optional default=150
+        The pixels per inch of the output images.
+    max_in_flight : Optional[int] optional default=None
+        The maximum number of jobs running at once.
+        If None, the number of CPUs is used.
+    session : Optional[LatexSession] optional default=None
+        Same as ``circuit_drawer``. Each job borrows its own scratch directory.
+
+    Yields
+    ------
+    LatexResult
+        The result of each job in the order of completion.
+
+    Examples
+    --------
+    >>> from qulacsvis.visualization import render_latex_parallel
+    >>> for result in render_latex_parallel(circuits, max_in_flight=8):
+    >>>     if result.error is None:
+    >>>         result.image.save(f"circuit_{result.position}.png")
+    """
+    if max_in_flight is None:
+        max_in_flight = os.cpu_count() or 1
+    latex_session = session if session is not None else default_session()
+
+    def run_job(circuit: Union[QuantumCircuit, CircuitData]) -> Image.Image:
+        if not isinstance(circuit, CircuitData):
+            circuit = to_model(circuit)
+        png = _render_latex_png(circuit, ppi, latex_session, error_dir=None)
+        return _decode_png(png)
+
+    jobs = enumerate(circuits)
+    # The jobs wait for the processes, so threads are enough to run them concurrently.
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        pending: Dict["Future[Image.Image]", int] = {
+            executor.submit(run_job, circuit): index
+            for index, circuit in itertools.islice(jobs, max_in_flight)
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                for next_index, circuit in itertools.islice(jobs, 1):
+                    pending[executor.submit(run_job, circuit)] = next_index
+
+                error = future.exception()
+                if error is None:
+                    yield LatexResult(index, future.result(), None)
+                else:
+                    yield LatexResult(index, None, error)
+
+
+def _render_latex_png(
+    circuit: CircuitData,
+    ppi: int,
+    session: LatexSession,
+    *,
+    error_dir: Optional[str] = ".",
+) -> bytes:
+    """
+    Draw a circuit with LaTeX and return the encoded PNG.
+
+    Only pdflatex writes files, in a scratch directory of the session.
+    The image is read from the stdout of pdftocairo.
+    """
+    with session.workspace() as tmpdir:
+        generator = LatexSourceGenerator(circuit)
+        session.latex.compile(
+            generator.iter_lines(),
+            tmpdir,
+            "circuit_drawer",
+            preamble=generator.preamble,
+            error_dir=error_dir,
+        )
+        return session.pdftoimage.convert_to_bytes(
+            os.path.join(tmpdir, "circuit_drawer"), ppi=ppi, error_dir=error_dir
+        )
+
+
+async def _render_latex_png_async(
+    circuit: CircuitData,
+    ppi: int,
+    session: LatexSession,
+    executor: Optional[Executor],
+) -> bytes:
+    """
+    Same as ``_render_latex_png``, awaiting pdflatex and pdftocairo.
+    The logs are not saved since concurrent drawings would overwrite them.
+    """
+    async with session.workspace_async(executor) as tmpdir:
+        generator = LatexSourceGenerator(circuit)
+        await session.latex.compile_async(
+            generator.iter_lines(),
+            tmpdir,
+            "circuit_drawer",
+            preamble=generator.preamble,
+            error_dir=None,
+            executor=executor,
+        )
+        return await session.pdftoimage.convert_to_bytes_async(
+            os.path.join(tmpdir, "circuit_drawer"), ppi=ppi, error_dir=None
+        )
+
+
+def _decode_png(png: bytes) -> Image.Image:
+    # The image is decoded here, so that a broken image fails at drawing.
+    image = Image.open(io.BytesIO(png))
+    image.load()
+    return image
+
+
+def _write_bytes(filename: str, data: bytes) -> None:
+    with open(filename, "wb") as f:
+        f.write(data)
+
+
+def _cached(
+    cache: Optional[DiskCache],
+    circuit: CircuitData,
+    output_method: str,
+    options: Dict[str, Any],
+    render: Callable[[], bytes],
+) -> bytes:
+    """
+    Look up the output of a drawing in a cache, rendering and storing it on a miss.
+    """
+    if cache is None:
+        return render()
+
+    key = _cache_key(circuit, output_method, options)
+    output = cache.get(key)
+    if output is None:
+        output = render()
+        cache.put(key, output)
+    return output
+
+
+def _cache_key(
+    circuit: CircuitData, output_method: str, options: Dict[str, Any]
+) -> str:
+    # The version and the preamble are part of the key, so that the outputs
+    # stored by an older renderer are not returned after the rendering changes.
+    preamble = LatexSourceGenerator(circuit).preamble if output_method != "text" else ""
+    return hashlib.blake2b(
+        repr(
+            (
+                __version__,
+                preamble,
+                circuit.digest(),
+                output_method,
+                sorted(options.items()),
+            )
+        ).encode(),
+        digest_size=16,
+    ).hexdigest()
@@ -1,10 +1,16 @@
-from typing import List
-
-import numpy as np
-
-from qulacsvis.models.circuit import CircuitData, ControlQubitInfo, GateData
+from typing import Iterable, Iterator, List, Sequence, TextIO
+
+from qulacsvis.models.circuit import (
+    CircuitData,
+    ControlQubitInfo,
+    GateData,
+    as_gate_grid,
+)
 from qulacsvis.utils.gate import grouping_adjacent_gates, to_latex_style
 
+# Options of the standalone class, which crop the page around the circuit.
+_CLASS_OPTIONS = "border={-2pt 5pt 5pt -7pt}"
+
 
 class LatexSourceGenerator:
     """Generate latex source from CircuitData
@@ -18,14 +24,14 @@ class LatexSourceGenerator:
     ----------
     _circuit_data : CircuitData
         The data of the quantum circuit.
-    _circuit : numpy.ndarray
+    _circuit : List[List[str]]
         A matrix containing strings converted from CircuitData for Qcircuit.
-        Each element and its position corresponds to one of GateData.
+        Each row is a qubit and each column is a layer of the circuit.
         Quantum circuit only, input values are not contained.
     _head : str
-        The head of the latex source containing preamble.
+        The head of the latex source containing preamble and ``\\begin{document}``.
     _tail : str
-        The tail of the latex source.
+        The tail of the latex source after the ``\\Qcircuit``.
 
     Examples
     --------
@@ -45,16 +51,14 @@ class LatexSourceGenerator:
 
     def __init__(self, circuit: CircuitData):
         self._circuit_data = circuit
-        self._circuit = np.array([[]])
-        self._head = r"""
-\documentclass[border={-2pt 5pt 5pt -7pt}]{standalone}
-\usepackage[braket, qm]{qcircuit}
-\usepackage{graphicx}
+        self._circuit: List[List[str]] = []
+        self._head = _preamble(_CLASS_OPTIONS) + "\\begin{document}\n"
+        self._tail = r"\end{document}"
 
-\begin{document}
-    \Qcircuit @C=1.0em @R=0.7em @!R{ \\
-"""
-        self._tail = r"    }" + "\n" + r"\end{document}"
+    @property
+    def preamble(self) -> str:
+        """The part of the latex source before ``\\begin{document}``"""
+        return _preamble(_CLASS_OPTIONS)
 
     def generate(self) -> str:
         """Generate latex source from QuantumCircuit
@@ -64,71 +68,95 @@ class LatexSourceGenerator:
         latex_source : str
             String of latex source generated
         """
-        qubit_count = self._circuit_data.qubit_count
-        circuit_layer_count = self._circuit_data.layer_count
+        return "".join(self.iter_lines())
 
-        input_label = np.array(
-            [
-                [
-                    # nghost reserves drawing area for input label,
-                    # adjusts the spacing between rows.
-                    r"\nghost{ q_{" + str(i) + "} : }",
-                    r"\lstick{ q_{" + str(i) + "} : }",
-                ]
-                for i in range(qubit_count)
-            ]
-        )
-
-        self._circuit = np.array([[] for _ in range(qubit_count)])
-        for layer in range(circuit_layer_count):
-            # This is an array containing strings.
-            # The string for each element is the string for the Qcircuit of the gate
-            # corresponding to each qubit row of the layer currently of interest.
-            current_layer_latex = [to_latex_style("wire") for _ in range(qubit_count)]
-            for qubit in range(qubit_count):
-                gate = self._circuit_data.gates[qubit][layer]
-
-                if gate.name == "ghost":
-                    continue
-                elif gate.name == "wire":
-                    continue
-                elif gate.name == "CNOT":
-                    self._cnot(current_layer_latex, gate)
-                elif gate.name == "Toffoli":
-                    self._cnot(current_layer_latex, gate)
-                elif gate.name == "SWAP":
-                    self._swap(current_layer_latex, gate)
-                elif len(gate.target_bits) > 1:
-                    self._multi_gate(current_layer_latex, gate)
-                else:
-                    self._gate(current_layer_latex, gate)
-
-            self._circuit = np.column_stack([self._circuit, current_layer_latex])  # type: ignore
-        wires = np.array([[r"\qw"] for _ in range(qubit_count)])
-        circuit_with_label = np.column_stack([input_label, self._circuit, wires])  # type: ignore
-        body = self._matrix_to_qcircuit_style(circuit_with_label)
-
-        return self._head + body + self._tail
-
-    def _matrix_to_qcircuit_style(self, matrix: List[List[str]]) -> str:
-        """Generate from matrix to string for Qcircuit
+    def write(self, fp: TextIO) -> None:
+        """Write latex source to a file line by line
 
         Parameters
         ----------
-        matrix : List[List[str]]
-            A matrix containing strings converted from GateDataSeq for Qcircuit.
-        Returns
-        -------
-        res : str
-            Generated string for Qcircuit from matrix
+        fp : TextIO
+            The file to write the latex source, e.g., an opened .tex file.
+        """
+        for line in self.iter_lines():
+            fp.write(line)
+
+    def iter_lines(self) -> Iterator[str]:
+        """Generate latex source line by line
+
+        The source of each qubit row is built when it is yielded,
+        so only the layout of the circuit is kept in memory.
+        ``"".join(generator.iter_lines())`` is the same as ``generate()``.
+
+        Yields
+        ------
+        line : str
+            A line of latex source, including the newline at the end
+            except for the last line.
+        """
+        yield from self._head.splitlines(keepends=True)
+        yield from self.iter_circuit_lines()
+        yield self._tail
+
+    def iter_circuit_lines(self) -> Iterator[str]:
+        """Generate the ``\\Qcircuit`` of the latex source line by line
+
+        The lines are the body of the document without the preamble,
+        which can be placed in other documents loading qcircuit.
+
+        Yields
+        ------
+        line : str
+            A line of the ``\\Qcircuit``, including the newline at the end.
         """
-        lines = [" & ".join(line) for line in matrix]
+        self._layout()
+
+        yield "    " + r"\Qcircuit @C=1.0em @R=0.7em @!R{ \\" + "\n"
         # add indent for latex source file
         indent = "        "
-        lines = [indent + line for line in lines]
-        res = (r"\\" + "\n").join(lines)
-        res += r"\\" + "\n"
-        return res
+        for i, row in enumerate(self._circuit):
+            # nghost reserves drawing area for input label,
+            # adjusts the spacing between rows.
+            input_label = [
+                r"\nghost{ q_{" + str(i) + "} : }",
+                r"\lstick{ q_{" + str(i) + "} : }",
+            ]
+            yield indent + " & ".join([*input_label, *row, r"\qw"]) + r"\\" + "\n"
+        if len(self._circuit) == 0:
+            yield r"\\" + "\n"
+        yield "    }\n"
+
+    def _layout(self) -> None:
+        """Convert the gates of the circuit to the cells of ``_circuit``"""
+        qubit_count = self._circuit_data.qubit_count
+        circuit_layer_count = self._circuit_data.layer_count
+
+        grid = as_gate_grid(self._circuit_data.gates)
+        # One column of cells per layer, filled with wires in advance.
+        # Each gate overwrites the cells of its qubits in the column of its layer.
+        layers_latex = [
+            [to_latex_style("wire")] * qubit_count for _ in range(circuit_layer_count)
+        ]
+        for gate, layer in zip(grid.table, grid.layers.tolist()):
+            # Gates without target qubits are not placed on the grid.
+            if layer < 0:
+                continue
+            current_layer_latex = layers_latex[layer]
+            if gate.name == "CNOT":
+                self._cnot(current_layer_latex, gate)
+            elif gate.name == "Toffoli":
+                self._cnot(current_layer_latex, gate)
+            elif gate.name == "SWAP":
+                self._swap(current_layer_latex, gate)
+            elif len(gate.target_bits) > 1:
+                self._multi_gate(current_layer_latex, gate)
+            else:
+                self._gate(current_layer_latex, gate)
+
+        if circuit_layer_count > 0:
+            self._circuit = [list(row) for row in zip(*layers_latex)]
+        else:
+            self._circuit = [[] for _ in range(qubit_count)]
 
     def _cnot(self, layer_latex: List[str], gate: GateData) -> None:
         """Generate CNOT gate for Qcircuit
@@ -148,7 +176,7 @@ class LatexSourceGenerator:
     def _control_bits(
         self,
         layer_latex: List[str],
-        control_bit_infos: List[ControlQubitInfo],
+        control_bit_infos: Sequence[ControlQubitInfo],
         target_bit: int,
     ) -> None:
         """Generate control bits for Qcircuit
@@ -214,7 +242,7 @@ class LatexSourceGenerator:
         gate_name_qcircuit_style = to_latex_style(gate.name)
         groups_adjacent_gates = grouping_adjacent_gates(gate.target_bits)
 
-        self._control_bits(layer_latex, gate.control_bit_infos, gate.target_bits[0])
+        self._control_bits(layer_latex, gate.control_bit_infos, min(gate.target_bits))
 
         for adjacent_gates in groups_adjacent_gates:
             size = len(adjacent_gates) - 1
@@ -253,3 +281,45 @@ class LatexSourceGenerator:
         target_bit = gate.target_bits[0]
         layer_latex[target_bit] = gate_qcircuit_style
         self._control_bits(layer_latex, gate.control_bit_infos, target_bit)
+
+
+def iter_batch_lines(circuits: Iterable[CircuitData]) -> Iterator[str]:
+    """
+    Generate latex source drawing each circuit on its own page
+
+    The source is a standalone document with the ``multi`` option,
+    whose pages are cropped as the output of ``LatexSourceGenerator``.
+
+    Parameters
+    ----------
+    circuits : Iterable[CircuitData]
+        The circuits to be drawn, in the order of the pages.
+
+    Yields
+    ------
+    line : str
+        A line of latex source, including the newline at the end
+        except for the last line.
+    """
+    yield from batch_preamble().splitlines(keepends=True)
+    yield "\\begin{document}\n"
+    for circuit in circuits:
+        yield "\\begin{standalone}\n"
+        yield from LatexSourceGenerator(circuit).iter_circuit_lines()
+        yield "\\end{standalone}\n"
+    yield r"\end{document}"
+
+
+def batch_preamble() -> str:
+    """The preamble of the latex source generated by ``iter_batch_lines()``"""
+    return _preamble(_CLASS_OPTIONS + ", multi")
+
+
+def _preamble(class_options: str) -> str:
+    return (
+        "\n"
+        f"\\documentclass[{class_options}]{{standalone}}\n"
+        "\\usepackage[braket, qm]{qcircuit}\n"
+        "\\usepackage{graphicx}\n"
+        "\n"
+    )
@@ -1,4 +1,4 @@
-from typing import List, Optional, Tuple
+from typing import List, Optional, Sequence, Tuple
 
 import matplotlib
 from matplotlib import patches
@@ -416,7 +416,7 @@ class MPLCircuitlDrawer:
             )
             if i == 0:
                 # Show the name only for the first group (multi_gate) and hide the rest
-                multi_gate_data.name = ""
+                multi_gate_data = GateData("")
 
         # Gray line connecting the gates
         ypos = min(gate.target_bits) * (
@@ -448,7 +448,7 @@ class MPLCircuitlDrawer:
 
         if gate.control_bit_infos is None:
             raise ValueError("control_bit_infos is None")
-        elif gate.control_bit_infos == []:
+        elif len(gate.control_bit_infos) == 0:
             raise ValueError("control_bit_infos is empty")
 
         self._not_mark(xy)
@@ -489,14 +489,16 @@ class MPLCircuitlDrawer:
         )
 
     def _control_bits(
-        self, control_bit_infos: List[ControlQubitInfo], xy_from: Tuple[float, float]
+        self,
+        control_bit_infos: Sequence[ControlQubitInfo],
+        xy_from: Tuple[float, float],
     ) -> None:
         """
         Draw control bits.
 
         Parameters
         ----------
-        control_bit_infos : List[ControlQubitInfo]
+        control_bit_infos : Sequence[ControlQubitInfo]
             The control bits to be drawn.
         xy_from : Tuple[float, float]
             The position of the gate from which the control bits are connected.
@@ -1,14 +1,34 @@
 # mypy: ignore-errors
 import dataclasses
+import functools
 import shutil
-from typing import Dict, List, Tuple
+import sys
+from typing import (
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
 
 import numpy as np
-from qulacs import QuantumCircuit, QuantumGateBase
-
-from qulacsvis.models.circuit import ControlQubitInfo
+import numpy.typing as npt
+from qulacs import QuantumCircuit
+
+from qulacsvis.models.circuit import (
+    CircuitData,
+    ControlQubitInfo,
+    GateData,
+    as_gate_grid,
+)
+from qulacsvis.utils.cache import LRUCache
 from qulacsvis.utils.gate import to_text_style
 
+from ..qulacs.circuit import to_model
+
 
 @dataclasses.dataclass
 class DotStyle:
@@ -22,6 +42,12 @@ CON_DOT_STYLE: Dict[str, DotStyle] = {
 }
 
 
+# 回路図の配列に描き込む文字のコードポイント
+_SPACE = ord(" ")
+_WIRE = ord("-")
+_WALL = ord("|")
+
+
 def _set_con_dot(dot: str) -> DotStyle:
     """
     Set a character to mean control qubit.
@@ -42,22 +68,31 @@ def _set_con_dot(dot: str) -> DotStyle:
         return CON_DOT_STYLE["large"]
 
 
+# ゲートの文字列表現のテンプレートのキャッシュ
+# キーは(ゲート名, ゲートのかかる一番上のqubitからの相対位置で表したターゲットqubit,
+#        同じく相対位置で表した制御qubitと制御値, 制御qubitの記号)
+# 値は(追加番号を空白にしたゲートの文字列表現, 追加番号を描き込む行)
+template_cache: LRUCache[Hashable, Tuple[Tuple[str, ...], int]] = LRUCache(maxsize=256)
+
+
 class _Gate_AA_Generator:
-    """qulacsの量子ゲート(QuantumGateBase)を描画するためのクラス"""
+    """量子ゲート(GateData)を描画するためのクラス"""
 
     def __init__(self, *, dot: str = "large") -> None:
         # このgate_stringにゲートの上の部分から文字列を作成して追加していきゲートの形を作成
         self.gate_string: List[str] = []
+        # gate_stringの中で追加番号を描き込む行
+        self.index_row = 0
 
         # 制御qubitの記号
         self.CON_DOT = _set_con_dot(dot)
 
     def generate(
-        self, gate: QuantumGateBase, index: str = "   ", verbose: bool = False
+        self, gate: GateData, index: str = "   ", verbose: bool = False
     ) -> List[str]:
         """引数のゲートを文字列表示で返してくれる関数
         Argeuments:
-            gate:    Qulacsのゲート(QuantumGateBase)
+            gate:    ゲート(GateData)
             index:   circuitに追加された順番を示す値, 1000以上の場合は表示が崩れる
             verbose: Trueだと詳細出力, 表示されるゲートにcircuitで追加された順番(引数のindex)を表示
         Return:
@@ -76,28 +111,48 @@ class _Gate_AA_Generator:
         6 -|   |-    <= gate_body_with_wire  : ゲートの左右の壁, ワイヤーのないものはgate_body
         7  |___|     <= gate_botom           : ゲートの下底
 
+        実際の回路には同じ形のゲートが繰り返し現れるので, 追加番号以外の部分はテンプレートとして
+        template_cacheにキャッシュし, ゲートごとには追加番号だけを描き込む
         """
+        # ゲートの形はゲートのかかるqubitの相対位置だけで決まる
+        base = gate.min_index
+        key = (
+            gate.name,
+            tuple(sorted(index - base for index in gate.target_bits)),
+            tuple(
+                sorted(
+                    (info.index - base, info.control_value)
+                    for info in gate.control_bit_infos
+                )
+            ),
+            self.CON_DOT.ctrl,
+            self.CON_DOT.ctrlo,
+        )
+        template = template_cache.get(key)
+        if template is None:
+            template = (tuple(self.generate_template(gate)), self.index_row)
+            template_cache.put(key, template)
+
+        lines, index_row = template
+        gate_string = list(lines)
+        # verboseに応じて回路への追加番号を描き込む
+        if verbose:
+            line = gate_string[index_row]
+            gate_string[index_row] = line[:2] + str(index).zfill(3) + line[5:]
+        return gate_string
+
+    def generate_template(self, gate: GateData) -> List[str]:
+        """追加番号を空白にしたゲートの文字列表示を作成する関数. 追加番号を描き込む行はself.index_rowに入る"""
         # ゲートの文字列表現を初期化
         self.gate_string.clear()
-
-        # verboseに応じて回路への追加番号を表示させるかさせないか文字列を作成
-        if verbose:
-            index = str(index).zfill(3)
-        else:
-            index = "   "
+        index = "   "
 
         # 実際にゲートが適用されるターゲットqubitのリストと, コントロール用の制御qubitのリストを取得
-        t_list = gate.get_target_index_list()
-        c_list = gate.get_control_index_list()
-        cv_list = [
-            ControlQubitInfo(index, control_value)
-            for index, control_value in gate.get_control_index_value_list()
-        ]
         # ゲート作成時の引数の順番や, add_control_qubitメソッドなどで
         # 制御qubitを追加したときなどでリストが昇順になっていないことがあるのでソートしておく
-        t_list.sort()
-        c_list.sort()
-        cv_list.sort(key=lambda x: x.index)
+        t_list = sorted(gate.target_bits)
+        c_list = sorted(gate.control_indices)
+        cv_list = sorted(gate.control_bit_infos, key=lambda x: x.index)
 
         # 制御qubitが実ゲート(ターゲットqubitにかかるゲート)より上に存在するかチェック
         if len(c_list) != 0 and min(t_list) > min(c_list):
@@ -169,7 +224,7 @@ class _Gate_AA_Generator:
                 self.gate_string[-p] = control_q_body
 
     def gen_target_part(
-        self, gate: QuantumGateBase, t_list: List[int], index: str, upper: bool
+        self, gate: GateData, t_list: List[int], index: str, upper: bool
     ) -> None:
         """ターゲットqubitにかかる部分のゲートの文字列表現を描くメソッド"""
         # ターゲットqubitにかかる部分のゲートの大きさを取得
@@ -187,7 +242,7 @@ class _Gate_AA_Generator:
         # ゲートの名前が表示される部分の形
         try:
             # ゲートの横幅を３文字分でゲート名を作成
-            gate_name = " |{}| ".format(to_text_style(gate.get_name()))
+            gate_name = " |{}| ".format(to_text_style(gate.name))
         except KeyError:
             # もし新たに追加されたゲートなどで見つからなかったときは"UnDeFined"
             gate_name = " |UDF| "
@@ -206,6 +261,7 @@ class _Gate_AA_Generator:
             # SWAP以外の全てのゲートは以下
             self.gate_string.append(gate_head)  # ゲートの一番頭部分
             self.gate_string.append(gate_name)  # ゲートの種類表示の部分
+            self.index_row = len(self.gate_string)
             self.gate_string.append("-|{}|-".format(index))  # ゲートの追加番号or空白の部分
             for i in range(1, gate_size * 4 - 3):  # 左右の壁の部分を描くループ
                 # ((i+2)//4)+(描き始めのqubitのインデックス)は現在いるqubitのインデックス描いているqubitのインデックス
@@ -281,6 +337,7 @@ class _Gate_AA_Generator:
 
         # 作成し始める
         self.gate_string.append(gate_head)  # 頭部分
+        self.index_row = len(self.gate_string)
         self.gate_string.append(gate_name)  # ゲートの種類表示の部分
         self.gate_string.append(swap_body_with_wire)  # SWAPする1つ目のqubitの"×"部分
         for i in range(1, gate_size * 4 - 4):  # 左右の壁の部分
@@ -351,32 +408,52 @@ class _Gate_AA_Generator:
 
 
 class TextCircuitDrawer:
-    """qulacsの量子回路(QuantumCircuit)を描画するためのクラス"""
-
-    def __init__(self, circuit: QuantumCircuit, *, dot: str = "large") -> None:
+    """量子回路(qulacs.QuantumCircuitまたはCircuitData)を描画するためのクラス"""
+
+    def __init__(
+        self,
+        circuit: Union[QuantumCircuit, CircuitData],
+        *,
+        dot: str = "large",
+        layers: Optional[Tuple[int, int]] = None,
+        qubits: Optional[Tuple[int, int]] = None,
+    ) -> None:
         # 制御qubitの記号
         self.CON_DOT = _set_con_dot(dot)
-        # 出力したい量子回路
-        self.circ = circuit
-        # 出力したい量子回路の深さ
-        self.depth = circuit.calculate_depth()
-        # 出力したい量子回路のqubit数
-        self.qubit_num = circuit.get_qubit_count()
+        # 出力したい量子回路. qulacsの量子回路はCircuitDataに変換して扱う
+        if not isinstance(circuit, CircuitData):
+            circuit = to_model(circuit)
+        self.circuit_data = circuit
+
+        # 描画する範囲(深さとqubitの窓). 指定が無ければ回路全体を描く
+        # 窓を指定したときは窓にかかるゲートだけを, CircuitDataの深さの位置に描く
+        self.windowed = layers is not None or qubits is not None
+        self.layer_range = _window(layers, circuit.layer_count, "layers")
+        self.qubit_range = _window(qubits, circuit.qubit_count, "qubits")
+        # 出力したい量子回路(の窓)のqubit数
+        self.qubit_num = self.qubit_range[1] - self.qubit_range[0]
+
+        # 単体のゲートの文字列表現を作成するクラスを呼び出す
+        self.AA_Generator = _Gate_AA_Generator(dot=dot)
+        # 描いた回路図(verbose, 行ごとの文字列)を保持し, 同じ回路図を何度も描かないようにする
+        self._drawn_lines: Optional[Tuple[bool, List[str]]] = None
+
+    def _init_picture(self) -> None:
+        """回路図を描き込む配列などを初期化するメソッド"""
+        # 出力したい量子回路(の窓)の深さ
+        self.depth = self.layer_range[1] - self.layer_range[0]
 
         # 量子回路図をできるだけ左詰め(回路が浅くなるよう)に配置するための参照する配列
-        # 2次元配列であり要素数は(qubit数)*(回路の深さ) <= 場合により深くなっていく
-        # 各qubitのそれぞれの深さにおいてゲートをセットできる場合はTrueを, できない場合はFalseを表示する
-        # 例) gate_map = [[False, False, True],  ← 1qubit目
-        #                 [False, True,  True],  ← 2qubit目
-        #                 [True,  True,  True]]  ← 3qubit目
-        #                   ↑      ↑      ↑
-        #                  深さ1   深さ2   深さ3
-        # 上のgate_mapは
+        # 要素数はqubit数で, 各qubitで次にゲートをセットできる深さ(0始まり)を保持する
+        # 例) next_column = [2,  ← 1qubit目
+        #                    1,  ← 2qubit目
+        #                    0]  ← 3qubit目
+        # 上のnext_columnは
         # ・1qubit目は深さ1と深さ2ですでにゲートが存在している, 次にゲートを適用できるのは深さ3の場所
         # ・2qubit目は深さ1の場所にすでにゲートが存在している, 次にゲートを適用できるのは深さ2の場所
         # ・3qubit目はまだゲートが存在していない, 次にゲートを適用できるのは深さ1の場所
         # を表す
-        self.gate_map = np.full((self.qubit_num, self.depth), True)
+        self.next_column = np.zeros(self.qubit_num, dtype=np.int64)
 
         # 量子回路の文字列表示を保持させる変数(2次元配列)
         # 要素に文字1文字を割り当て、回路図として表現する方針
@@ -399,30 +476,91 @@ class TextCircuitDrawer:
         # ↑縦サイズ                <=====> ゲートの幅は3文字分, これに前後の壁である"-|", "|-"を
         #                                合わせると１つのゲートの幅は7文字分.
 
+        # circuit_pictureは深さ(CircuitDataのlayer_count)から求めた大きさで確保しておく.
+        # 配置によって深さが足りなくなった場合は_expand_pictureで横方向の容量を倍々に確保し直すので,
+        # 配列の横幅(容量)は横サイズより大きいことがある. 横サイズを超える部分は空白のまま.
+        # 各要素は文字のコードポイント(uint32)で, ワイヤーの接続などを配列演算で行えるようにしている.
         self.vertical_size = self.qubit_num * 4  # 縦サイズ
         self.horizontal_size = self.depth * 7 + self.depth - 1 + 2  # 横サイズ
         self.circuit_picture = np.full(
-            (self.vertical_size, self.horizontal_size), " "
+            (self.vertical_size, self.horizontal_size), _SPACE, dtype=np.uint32
         )  # 配列作成,空白1文字で初期化
         # 量子回路の左端と右端のワイヤーを"-"で描いておく
-        for i in range(self.qubit_num):
-            # 横向きのワイヤーがある場所は配列番号で2,6,10,14,...番目
-            row = (i + 1) * 4 - 2
-            self.circuit_picture[row][0] = "-"
-            self.circuit_picture[row][-1] = "-"
-
-        # 単体のゲートの文字列表現を作成するクラスを呼び出す
-        self.AA_Generator = _Gate_AA_Generator(dot=dot)
+        # 横向きのワイヤーがある場所は配列番号で2,6,10,14,...番目
+        self.circuit_picture[2::4, 0] = _WIRE
+        self.circuit_picture[2::4, self.horizontal_size - 1] = _WIRE
 
     def draw(self, verbose: bool) -> None:
         """実際に回路を描き始め出力までするメソッド"""
-        # 出力したい量子回路の持つゲート数を取得
-        gate_num = self.circ.get_gate_count()
+        _draw_lines(self._draw_picture(verbose))
+
+    def render(self, width: Optional[int] = None, *, verbose: bool = False) -> str:
+        """
+        回路図を文字列で返すメソッド
+
+        Parameters
+        ----------
+        width: Optional[int]
+            回路図を折り返す横幅(default=None). Noneのときは折り返さない
+        verbose: bool
+            詳細出力(default=False). Trueのときはgateにcircuitに追加された順番が出力される
+
+        Returns
+        -------
+        str
+            回路図の文字列. drawで表示されるものと同じ形式
+        """
+        return "".join(_fold_pages(self._draw_picture(verbose), width))
+
+    def write(
+        self, fp: TextIO, width: Optional[int] = None, *, verbose: bool = False
+    ) -> None:
+        """
+        回路図をファイルなどに書き込むメソッド. 折り返した1ページごとに1回書き込む
+
+        Parameters
+        ----------
+        fp: TextIO
+            書き込み先(ファイル, io.StringIO, ソケットのmakefile()など)
+        width: Optional[int]
+            回路図を折り返す横幅(default=None). Noneのときは折り返さない
+        verbose: bool
+            詳細出力(default=False). Trueのときはgateにcircuitに追加された順番が出力される
+        """
+        for page in _fold_pages(self._draw_picture(verbose), width):
+            fp.write(page)
+
+    def _draw_picture(self, verbose: bool) -> List[str]:
+        """回路図を描き, 行ごとの文字列として返すメソッド"""
+        if self._drawn_lines is not None and self._drawn_lines[0] == verbose:
+            return self._drawn_lines[1]
+
+        self._init_picture()
+        if self.windowed:
+            self._draw_window(verbose)
+        else:
+            self._draw_all(verbose)
+
+        # 容量として余分に確保した部分を切り落とす
+        self.circuit_picture = self.circuit_picture[:, : self.horizontal_size]
+
+        # ゲートを描き終えたら, ゲート同士や接続が切れているワイヤーを繋ぐ
+        self._connect_wire()
+
+        lines = self._picture_lines()
+        if self.windowed:
+            lines = self._elide(lines)
+        self._drawn_lines = (verbose, lines)
+        return lines
+
+    def _draw_all(self, verbose: bool) -> None:
+        """回路全体のゲートを描き込むメソッド"""
+        # 回路に追加された順番に並んだゲートの表を取得
+        gate_table = as_gate_grid(self.circuit_data.gates).table
         # ゲートを１つずつ取り出し回路図に描き込んでいく
-        for i in range(gate_num):
-            gate = self.circ.get_gate(i)
+        for i, gate in enumerate(gate_table):
             # 確率的に作用するゲートなどでtarget_qubitのインデックスが無いものはスキップする
-            if len(gate.get_target_index_list()) == 0:
+            if len(gate.target_bits) == 0:
                 print(
                     f"CAUTION: The {i}-th Gate you added is skipped."
                     + 'This gate does not have "target_qubit_list"'
@@ -430,52 +568,53 @@ class TextCircuitDrawer:
             else:
                 self._draw_gate(gate, index=i, verbose=verbose)
 
-        # ゲートを描き終えたら, ゲート同士や接続が切れているワイヤーを繋ぐ
-        self._connect_wire()
-
-        # 描き込まれたゲートを実際に出力する
-        # ただし、回路の長さに応じて表示方法を変える
-        terminal_size = shutil.get_terminal_size().columns - 1  # プロンプトの1行に表示できる文字数-1
-        # プロンプトに収まる場合は普通に表示
-        if self.horizontal_size <= terminal_size:
-            for line in self.circuit_picture:
-                print("".join(line))
-        # 回路が長いときは途中で折り返して表示する
-        else:
-            # 折り返して表示するときの、表示を繰り返す回数
-            col = self.horizontal_size // terminal_size
-            # 折り返して表示する際の区切り文字。"#"で区切る
-            delimiter = "\n" + "#" * terminal_size
-            # 回路図のどこまでを表示したか思えておく変数
-            plot_range = 0
-            # プロンプトの横幅までの表示を繰り返す
-            print(delimiter)
-            for i in range(col):
-                # 今何回目の表示かを出力
-                print(">>", i)
-                # 回路図の出力
-                for line in self.circuit_picture:
-                    print("".join(line[plot_range : plot_range + terminal_size]))
-                # 表示済みの回路図を記憶
-                plot_range += terminal_size
-                # 区切りの出力
-                print(delimiter)
-            # 回路の最後の部分の表示
-            print(">>", col)
-            for line in self.circuit_picture:
-                print("".join(line[plot_range:]))
-            print(delimiter)
-
-    def _draw_gate(self, gate: QuantumGateBase, index: str, verbose: bool) -> None:
+    def _draw_window(self, verbose: bool) -> None:
+        """窓にかかるゲートだけを, CircuitDataでの深さの位置に描き込むメソッド"""
+        start, stop = self.layer_range
+        lo, hi = self.qubit_range
+        grid = as_gate_grid(self.circuit_data.gates)
+        # 窓の深さにあるゲートの番号を, 回路に追加された順番に取り出す
+        # 窓の外のqubitにしかかからないゲートは描かない
+        window_ids = grid.ids[:, start:stop]
+        for i in np.unique(window_ids[window_ids >= 0]).tolist():
+            gate = grid.table[i]
+            if gate.max_index < lo or gate.min_index >= hi:
+                continue
+            gate_string = self.AA_Generator.generate(gate, i, verbose)
+            # 窓の上端より上から始まるゲートは, 描き込むときに窓の外の部分が切り落とされる
+            row = (gate.min_index - lo) * 4
+            col = (int(grid.layers[i]) - start) * 8 + 1
+            self._write_gate_on_picture(gate_string, (row, col))
+
+    def _elide(self, lines: List[str]) -> List[str]:
+        """窓の外に続くワイヤーの端に省略記号"..."を付けるメソッド"""
+        start, stop = self.layer_range
+        lo, hi = self.qubit_range
+        # 左右: 窓の外に続くワイヤーの端の"-"を"..."に置き換える
+        if start > 0:
+            lines = [
+                ("..." if row % 4 == 2 else "   ") + line[1:]
+                for row, line in enumerate(lines)
+            ]
+        if stop < self.circuit_data.layer_count:
+            lines = [
+                line[:-1] + ("..." if row % 4 == 2 else "   ")
+                for row, line in enumerate(lines)
+            ]
+        # 上下: 窓の外にもqubitが続くことを"..."の行で示す
+        width = len(lines[0]) if lines else 0
+        if lo > 0:
+            lines = ["...".ljust(width)] + lines
+        if hi < self.circuit_data.qubit_count:
+            lines = lines + ["...".ljust(width)]
+        return lines
+
+    def _draw_gate(self, gate: GateData, index: str, verbose: bool) -> None:
         """引数にgateをとり, 「ゲートの文字化」, 「適切な位置に描き込み」 の順で実際に描き込むメソッド"""
         # 単一のゲートの文字列表示を作成
         gate_string = self.AA_Generator.generate(gate, index, verbose)
 
-        # 実際にゲートが適用されるターゲットqubitと, コントロール用の制御qubitのリストを取得
-        target_qubit_list = gate.get_target_index_list()
-        control_qubit_list = gate.get_control_index_list()
-        # 続いて, 制御qubitとターゲットqubitの両方を合わせた, 実際にゲートがかかるqubitのリストを取得.
-        tc_list = target_qubit_list + control_qubit_list
+        # 制御qubitとターゲットqubitの両方を合わせた, 実際にゲートがかかるqubitの範囲を使う.
         # これは例えばCNOT(0,2), X(1)のような回路を描こうとしたとき, 回路の深さは1だがそのまま深さ1で描こうとすると
         # ゲートの追加順に応じて CNOTの制御用ワイヤー上にXゲートが乗ってしまう or Xゲートで縦向きの制御信号の上書き
         # が起こってしまった. よって, 本プログラムでは回路の深さを増やして表示が重ならないようにして対応しようと考えた.
@@ -483,33 +622,22 @@ class TextCircuitDrawer:
 
         # circuit_pictureに描き込むに必要な左上隅のインデックスを取得
         # 引数は使用するqubitのリストの最小値と最大値
-        upper_left_corner = self._place_check(min(tc_list), max(tc_list))
+        upper_left_corner = self._place_check(gate.min_index, gate.max_index)
         # 作成した文字列表示をircuit_pictureに描き込む
         self._write_gate_on_picture(gate_string, upper_left_corner)
 
     def _place_check(self, min_v: int, max_v: int) -> Tuple[int, int]:
         """適切なゲートの描き込み位置を計算するメソッド"""
-        # 回路の浅い所から探索
-        for i in range(self.depth):
-            # 使用したいqubitすべてが利用できるかチェック
-            if all(self.gate_map[min_v : max_v + 1, i]):
-                # 現在使うqubitの位置をFalseに変更する
-                # このときTrueの場所(ゲートのかかる場所)より左側も全部Falseにする
-                # そうしておかないと, 左詰めで適用する実装になっているので
-                # 後から適用する1qubitゲートがその前にかかってしまったりする
-                self.gate_map[min_v : max_v + 1, : i + 1] = False
-                # 最終的に作成する２次元配列で考えた場合のqubitの位置・深さを計算するため
-                # gate_mapの場合の計算結果を変数に保持させて終了する
-                col = i
-                break
-
-            # 一番深いとこまで探索したのに, 描き込める場所が見つからなかったとき
-            elif i + 1 == self.depth:
-                # gate_mapとcircuit_pictureを拡張する
-                self._expand_map_and_picture()
-                # 追加した場所にゲートを割り当てていく
-                self.gate_map[min_v : max_v + 1, : i + 2] = False
-                col = i + 1
+        # 使用したいqubitすべてが利用できる最も浅い深さは, それらのqubitのnext_columnの最大値
+        col = int(self.next_column[min_v : max_v + 1].max())
+        # 使用するqubitのnext_columnをゲートの次の深さに進める
+        # 左詰めで適用する実装になっているので, 後から適用する1qubitゲートが
+        # このゲートより前にかかってしまわないよう, 使用するqubit全てを同じ深さに揃える
+        self.next_column[min_v : max_v + 1] = col + 1
+
+        # 一番深いとこまで埋まっていて, 描き込める場所が無いときはcircuit_pictureを拡張する
+        if col == self.depth:
+            self._expand_picture()
 
         # 仕様(２次元配列)に合わせて位置を調整
         row = min_v * 4
@@ -517,96 +645,249 @@ class TextCircuitDrawer:
 
         return row, col
 
-    def _expand_map_and_picture(self) -> None:
+    def _expand_picture(self) -> None:
         """回路図が重なって表示されないように深さを増やすメソッド"""
-        # self.gate_mapの拡張
-        additional_gate_map = np.full(self.qubit_num, True).reshape(self.qubit_num, 1)
-        self.gate_map = np.concatenate([self.gate_map, additional_gate_map], axis=1)
-
-        # self.circuit_pictureを拡張
-        additional_circuit_pic = np.full((self.vertical_size, 8), " ")
-        self.circuit_picture = np.concatenate(
-            [self.circuit_picture, additional_circuit_pic], axis=1
-        )
-        # 右端を"-"でセット
-        for i in range(self.qubit_num):
-            # 横向きのワイヤーがある場所は配列番号で2,6,10,14,...番目
-            row = (i + 1) * 4 - 2
-            self.circuit_picture[row][-1] = "-"
-
-        # 深さを+1
-        self.depth += 1
         # 深さが+1になったのでcircuit_pictureの横サイズも増やす
+        self.depth += 1
         self.horizontal_size += 8
 
+        # 容量が足りないときだけ, 容量を2倍にしたcircuit_pictureを作って描き込み済みの部分をコピーする
+        # 拡張のたびに1深さ分ずつ連結すると深さの2乗に比例するコピーが起こるため
+        capacity = self.circuit_picture.shape[1]
+        if self.horizontal_size > capacity:
+            capacity = max(self.horizontal_size, capacity * 2)
+            circuit_picture = np.full(
+                (self.vertical_size, capacity), _SPACE, dtype=np.uint32
+            )
+            circuit_picture[:, : self.horizontal_size - 8] = self.circuit_picture[
+                :, : self.horizontal_size - 8
+            ]
+            self.circuit_picture = circuit_picture
+
+        # 右端を"-"でセット
+        self.circuit_picture[2::4, self.horizontal_size - 1] = _WIRE
+
     def _write_gate_on_picture(
         self, gate_string: List[str], ulc: Tuple[int, int]
     ) -> None:
         """作成したゲート文字列を実際に描き込むメソッド"""
         row, col = ulc
         width = 7
-        for line in gate_string:
-            self.circuit_picture[row][col : col + width] = list(line)
-            row += 1
+        # ゲート文字列の各行をまとめてコードポイントの2次元配列に変換して描き込む
+        code_points = np.frombuffer(
+            "".join(gate_string).encode("utf-32-le"), dtype="<u4"
+        ).reshape(len(gate_string), width)
+        # 窓を指定したときは回路図の上下からはみ出す部分を切り落とす
+        if row < 0:
+            code_points = code_points[-row:]
+            row = 0
+        code_points = code_points[: self.vertical_size - row]
+        self.circuit_picture[
+            row : row + len(code_points), col : col + width
+        ] = code_points
+
+    def _picture_lines(self) -> List[str]:
+        """circuit_pictureを行ごとの文字列に変換するメソッド"""
+        text = self.circuit_picture.astype("<u4").tobytes().decode("utf-32-le")
+        width = self.horizontal_size
+        return [text[i * width : (i + 1) * width] for i in range(self.vertical_size)]
 
     def _connect_wire(self) -> None:
         """量子回路の横向きのワイヤーの接続を補うメソッド"""
-        # 回路のqubit数回ループ
-        for i in range(self.qubit_num):
-            # 横向きのワイヤーがある場所は配列番号で2,6,10,14,...番目
-            row = (i + 1) * 4 - 2
-            # 先頭から１文字ずつ調査していくための変数
-            p = 0
-            # 各行の先頭から見ていく
-            while True:
-                # 先頭の文字を読む
-                char_now = self.circuit_picture[row][p]
-                if char_now in f"{self.CON_DOT.ctrl}{self.CON_DOT.ctrlo}":
-                    # 読んだのが"･"のときは次の文字が必ず空白になっているはずなので"-"に書き換える
-                    self.circuit_picture[row][p + 1] = "-"
-                elif char_now == "-":
-                    # 読んだのが"-"のときは次の１文字を読む
-                    if self.circuit_picture[row][p + 1] == " ":
-                        # "-"の次が" "(空白)なので"-"に書き換えワイヤーを繋げる
-                        self.circuit_picture[row][p + 1] = "-"
-                    elif self.circuit_picture[row][p + 1] == "|":
-                        # 読んだ文字が"|"のときはゲートの左壁にぶつかったorコントロールユニタリの制御信号(縦線)のどちらか
-                        # 最初に, 3文字分(通常のゲートの横幅分)を空けて次の文字を読んでみる
-                        # つまりp+1 + 3 + 1文字分先を読む
-                        if self.circuit_picture[row][p + 5] == "|":
-                            # ぶつかったのは通常のゲートの幅の左壁だったので, ゲートの右側まで抜ける
-                            # 現在位置pは(左壁の位置-1)で+5すれば現在地は右壁の"|"になる
-                            # そして最後のインクリメントで右壁の次にいく
-                            p += 5
-                        elif self.circuit_picture[row][p + 3] == "|":
-                            # ぶつかったのは離れたqubitにかかるゲート用の壁(幅の狭いゲート)の左壁だった
-                            # +3すれば現在地は右壁の"|"になるので, 最後のインクリメントで右壁の次にいく
-                            p += 3
-                        else:
-                            # 読んでみるとゲートの右の壁でない => 読んだのはコントロールユニタリの縦線だった
-                            # なので次の空白を"-"とする
-                            # "|"を"+"に書き換えワイヤーがクロスする表示も試したが,
-                            # どこが制御qubitかわかりにくかったのでやめた.
-                            self.circuit_picture[row][p + 2] = "-"
-                            # 次に読む文字を今変更した"-"にするために調整
-                            p += 1
-                # インクリメントして次の文字の位置をセット
-                p += 1
-                # もしインクリメントしたときに配列のサイズを超えたら終了
-                if p + 1 == self.horizontal_size:
-                    break
+        # 深さ0の回路(ゲートが1つも無い回路)は描けない
+        if self.depth == 0:
+            raise IndexError("The circuit has no gates to draw.")
+
+        # 横向きのワイヤーがある行(配列番号で2,6,10,14,...番目)を取り出す
+        # 0列目は左端のワイヤーで, 以降は(ゲートの幅7文字)+(ゲート間のワイヤー1文字)の8文字ずつ深さごとに並ぶ
+        # wire_rows[qubit, 深さ, 0:7]がゲートの部分, wire_rows[qubit, 深さ, 7]がゲート間(または右端)のワイヤー
+        wire_rows = self.circuit_picture[2::4, 1:].reshape(
+            self.qubit_num, self.depth, 8
+        )
+
+        # ワイヤー上の空白は基本的に全て"-"に書き換えてワイヤーを繋ぐ.
+        # ただしゲートの左右の壁に挟まれた内側の空白はゲートの中身なので書き換えない.
+        #   通常のゲート          "-|   |-" : 1文字目と5文字目が壁
+        #   離れたqubitの間の部分 "--| |--" : 2文字目と4文字目が壁
+        # コントロールユニタリの縦線"   |   "や制御qubitの"･"の前後の空白はワイヤーとして繋ぐ.
+        # "|"を"+"に書き換えワイヤーがクロスする表示も試したが,
+        # どこが制御qubitかわかりにくかったのでやめた.
+        inside = np.zeros(wire_rows.shape, dtype=bool)
+        wide_gate = (wire_rows[..., 1] == _WALL) & (wire_rows[..., 5] == _WALL)
+        narrow_gate = (wire_rows[..., 2] == _WALL) & (wire_rows[..., 4] == _WALL)
+        inside[..., 2:5] = wide_gate[..., np.newaxis]
+        inside[..., 3] |= narrow_gate
+        wire_rows[(wire_rows == _SPACE) & ~inside] = _WIRE
+
+
+class CompactTextCircuitDrawer(TextCircuitDrawer):
+    """
+    量子回路を1qubitにつき1行, 1深さにつき4文字の小さなテキストで描画するためのクラス
+
+    ゲートはto_text_styleの略称で, 制御qubitは制御qubitの記号1文字で,
+    CNOTなどのターゲットqubitは1文字で描く. 追加番号(verbose)は表示しない.
+    例) circuit_drawerのdocstringの回路は以下のように描かれる
+        --X--DeM--X------
+        --Y--DeM--|------
+        --Z-------●---X--
+    """
+
+    def _draw_picture(self, verbose: bool) -> List[str]:
+        """回路図を描き, 行ごとの文字列として返すメソッド"""
+        if self._drawn_lines is not None:
+            return self._drawn_lines[1]
+
+        start, stop = self.layer_range
+        lo, hi = self.qubit_range
+        self.depth = stop - start
+        # 深さ0の回路(ゲートが1つも無い回路)は描けない
+        if self.depth == 0:
+            raise IndexError("The circuit has no gates to draw.")
+
+        # 横幅は左端のワイヤー1文字と, 深さごとの(ゲートの3文字)+(ワイヤー1文字)
+        self.vertical_size = self.qubit_num
+        self.horizontal_size = 1 + 4 * self.depth
+        picture = np.full(
+            (self.vertical_size, self.horizontal_size), _WIRE, dtype=np.uint32
+        )
+        dots = {0: ord(self.CON_DOT.ctrlo), 1: ord(self.CON_DOT.ctrl)}
+
+        grid = as_gate_grid(self.circuit_data.gates)
+        # 窓の深さにあるゲートを回路に追加された順番に取り出し, CircuitDataでの深さの位置に描く
+        window_ids = grid.ids[:, start:stop]
+        for i in np.unique(window_ids[window_ids >= 0]).tolist():
+            gate = grid.table[i]
+            if gate.max_index < lo or gate.min_index >= hi:
+                continue
+            col = 1 + (int(grid.layers[i]) - start) * 4
+            # ゲートのかかるqubitの間は縦向きのワイヤーで繋ぐ
+            top = max(gate.min_index, lo) - lo
+            bottom = min(gate.max_index + 1, hi) - lo
+            picture[top:bottom, col + 1] = _WALL
+            for info in gate.control_bit_infos:
+                if lo <= info.index < hi:
+                    picture[info.index - lo, col + 1] = dots[info.control_value]
+            cell = _compact_cell(gate.name)
+            for target in gate.target_bits:
+                if lo <= target < hi:
+                    picture[target - lo, col : col + 3] = cell
+
+        self.circuit_picture = picture
+        lines = self._picture_lines()
+        if self.windowed:
+            lines = self._elide(lines)
+        self._drawn_lines = (verbose, lines)
+        return lines
+
+    def _elide(self, lines: List[str]) -> List[str]:
+        """窓の外に続くワイヤーの端に省略記号"..."を付けるメソッド"""
+        start, stop = self.layer_range
+        lo, hi = self.qubit_range
+        if start > 0:
+            lines = ["..." + line[1:] for line in lines]
+        if stop < self.circuit_data.layer_count:
+            lines = [line[:-1] + "..." for line in lines]
+        width = len(lines[0]) if lines else 0
+        if lo > 0:
+            lines = ["...".ljust(width)] + lines
+        if hi < self.circuit_data.qubit_count:
+            lines = lines + ["...".ljust(width)]
+        return lines
+
+
+# 小さなテキストでの描画で1文字で描くゲート
+_COMPACT_GLYPHS = {"CNOT": "X", "Toffoli": "X", "CZ": "Z", "SWAP": "x"}
+
+
+@functools.lru_cache(maxsize=None)
+def _compact_cell(gate_name: str) -> npt.NDArray[np.uint32]:
+    """小さなテキストでの描画で, ターゲットqubitに描く3文字のコードポイントを返す関数"""
+    try:
+        glyph = _COMPACT_GLYPHS.get(gate_name) or to_text_style(gate_name).strip()
+    except KeyError:
+        # もし新たに追加されたゲートなどで見つからなかったときは"UnDeFined"
+        glyph = "UDF"
+    # 1文字のときは中央に, 2文字のときは左詰めにして残りをワイヤーで埋める
+    cell = glyph.center(3, "-") if len(glyph) == 1 else glyph.ljust(3, "-")
+    return np.array([ord(char) for char in cell], dtype=np.uint32)
+
+
+def _draw_lines(lines: List[str]) -> None:
+    """回路図の行を標準出力に表示する関数"""
+    # 標準出力に表示するときだけ, 回路の長さに応じてプロンプトの横幅で折り返す
+    terminal_size = shutil.get_terminal_size().columns - 1  # プロンプトの1行に表示できる文字数-1
+    for page in _fold_pages(lines, terminal_size):
+        sys.stdout.write(page)
+
+
+def _fold_pages(lines: List[str], width: Optional[int]) -> Iterator[str]:
+    """回路図を横幅widthで折り返し, 1ページずつ文字列にして返す関数"""
+    horizontal_size = len(lines[0]) if lines else 0
+    # 横幅に収まる場合は折り返さない
+    if width is None or horizontal_size <= width:
+        yield "".join(line + "\n" for line in lines)
+        return
+
+    # 回路が長いときは途中で折り返す
+    # 折り返して表示するときの、表示を繰り返す回数
+    col = horizontal_size // width
+    # 折り返して表示する際の区切り文字。"#"で区切る
+    delimiter = "\n" + "#" * width + "\n"
+    for i in range(col + 1):
+        page = [delimiter] if i == 0 else []
+        # 今何回目の表示かを出力
+        page.append(f">> {i}\n")
+        # 回路図の出力. 最後は回路の残りの部分全て
+        plot_range = slice(i * width, (i + 1) * width if i < col else None)
+        page.extend(line[plot_range] + "\n" for line in lines)
+        # 区切りの出力
+        page.append(delimiter)
+        yield "".join(page)
+
+
+def _window(window: Optional[Tuple[int, int]], size: int, name: str) -> Tuple[int, int]:
+    """
+    描画する範囲を回路の大きさに収まるよう切り詰める
+
+    Parameters
+    ----------
+    window: Optional[Tuple[int, int]]
+        範囲(start, stop). Noneのときは回路全体
+    size: int
+        回路の深さまたはqubit数
+    name: str
+        エラーメッセージに使う引数の名前
+
+    Returns
+    -------
+    Tuple[int, int]
+        切り詰めた範囲
+
+    Raises
+    ------
+    ValueError
+        範囲に深さ(qubit)が1つも含まれないとき
+    """
+    if window is None:
+        return 0, size
+    start, stop = max(window[0], 0), min(window[1], size)
+    if start >= stop:
+        raise ValueError(f"{name}={window} is empty for the circuit of size {size}.")
+    return start, stop
 
 
 def draw_circuit(
-    circuit: QuantumCircuit, verbose: bool = False, dot: str = "large"
+    circuit: Union[QuantumCircuit, CircuitData],
+    verbose: bool = False,
+    dot: str = "large",
 ) -> None:
     """
     量子回路図をテキストで出力するための関数
 
     Parameters
     ----------
-    circuit: qulacs.QuantumCircuit
-        出力したい量子回路(qulacs.QuantumCircuit)
+    circuit: qulacs.QuantumCircuit or CircuitData
+        出力したい量子回路(qulacs.QuantumCircuit)またはCircuitData
     verbose: bool
         詳細出力(default=False). Trueのときはgateにcircuitに追加された順番が出力される
     dot: str
@@ -0,0 +1,56 @@
+import os
+import tempfile
+
+import numpy as np
+import pytest
+from qulacs import QuantumCircuit
+
+from qulacsvis.models.binary import dump_binary, load_binary
+from qulacsvis.models.circuit import CircuitData, GateGrid
+from qulacsvis.qulacs.circuit import to_model
+
+from .circuit_test_data import load_circuit_data
+
+circuit_data = load_circuit_data()
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+@pytest.mark.parametrize(
+    "circuit", list(circuit_data.values()), ids=list(circuit_data.keys())
+)
+def test_binary_round_trip(circuit: QuantumCircuit, mmap: bool) -> None:
+    model = to_model(circuit)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "circuit.qvis")
+        dump_binary(model, path)
+        loaded = load_binary(path, mmap=mmap)
+
+        assert loaded.qubit_count == model.qubit_count
+        assert loaded.layer_count == model.layer_count
+        assert isinstance(loaded.gates, GateGrid)
+        assert isinstance(model.gates, GateGrid)
+        np.testing.assert_array_equal(loaded.gates.layers, model.gates.layers)
+        assert list(loaded.gates.table) == list(model.gates.table)
+        assert loaded.gates.to_list() == model.gates.to_list()
+        del loaded
+
+
+def test_dump_nested_lists() -> None:
+    model = to_model(circuit_data["dense_matrix_gate_with_target_bits"])
+    assert isinstance(model.gates, GateGrid)
+    nested = CircuitData(model.qubit_count, model.layer_count, model.gates.to_list())
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "circuit.qvis")
+        dump_binary(nested, path)
+        loaded = load_binary(path)
+        assert loaded.gates == model.gates
+        del loaded
+
+
+def test_load_invalid_file() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "circuit.qvis")
+        with open(path, "wb") as f:
+            f.write(b"\0" * 64)
+        with pytest.raises(ValueError):
+            load_binary(path)
@@ -0,0 +1,69 @@
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from qulacsvis import circuit_drawer
+from qulacsvis.utils.latex import run_process_async
+from qulacsvis.visualization import circuit_drawer_async
+
+from .circuit_test_data import load_circuit_data
+
+circuit_data = load_circuit_data()
+
+
+@pytest.mark.parametrize(
+    "output_method,options",
+    [
+        ("text_source", {"verbose": True}),
+        ("text_source", {"compact": True}),
+        ("latex_source", {}),
+    ],
+)
+def test_circuit_drawer_async(output_method: str, options: Any) -> None:
+    circuit = circuit_data["skqulacs_qcl_ansatz"]
+    expected = circuit_drawer(circuit, output_method, **options)
+    out = asyncio.run(circuit_drawer_async(circuit, output_method, **options))
+    assert out == expected
+
+
+def test_circuit_drawer_async_invalid_output_method() -> None:
+    circuit = circuit_data["cnot_gate_circuit"]
+    with pytest.raises(ValueError):
+        asyncio.run(circuit_drawer_async(circuit, "invalid"))
+
+
+def test_run_process_async() -> None:
+    out = asyncio.run(run_process_async([sys.executable, "-c", "print('ok')"]))
+    assert out.strip() == b"ok"
+
+    with pytest.raises(subprocess.CalledProcessError) as excinfo:
+        asyncio.run(
+            run_process_async([sys.executable, "-c", "print('error'); exit(3)"])
+        )
+    assert excinfo.value.returncode == 3
+    assert excinfo.value.output.strip() == b"error"
+
+
+def test_run_process_async_timeout(tmp_path: Path) -> None:
+    pid_path = tmp_path / "pid"
+    script = (
+        "import os, sys, time\n"
+        "with open(sys.argv[1], 'w') as f:\n"
+        "    f.write(str(os.getpid()))\n"
+        "time.sleep(60)\n"
+    )
+
+    async def run() -> None:
+        process = run_process_async([sys.executable, "-c", script, str(pid_path)])
+        await asyncio.wait_for(process, 1.0)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
+    # The process has been killed and reaped.
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_path.read_text()), 0)
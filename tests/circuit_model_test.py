@@ -0,0 +1,186 @@
+import dataclasses
+import io
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import pytest
+from qulacs import QuantumCircuit
+
+from qulacsvis.models.circuit import (
+    GHOST_ID,
+    WIRE_ID,
+    CircuitData,
+    CircuitDataBuilder,
+    ControlQubitInfo,
+    GateData,
+    GateGrid,
+)
+from qulacsvis.qulacs.circuit import to_model, update_model
+
+from .circuit_test_data import load_circuit_data
+
+circuit_data = load_circuit_data()
+
+
+def test_gate_grid_ids() -> None:
+    gates = [
+        GateData("X", [0]),
+        GateData("DenseMatrix", [0, 2]),
+        GateData("CNOT", [2], [ControlQubitInfo(1, 1)]),
+    ]
+    model = CircuitData.from_gate_sequence(gates, 3)
+    assert isinstance(model.gates, GateGrid)
+    assert model.gates.ids.dtype == np.int32
+    np.testing.assert_array_equal(
+        model.gates.ids,
+        [
+            [0, 1, WIRE_ID],
+            [WIRE_ID, WIRE_ID, WIRE_ID],
+            [WIRE_ID, GHOST_ID, 2],
+        ],
+    )
+    assert model.gates[0][1] is gates[1]
+    assert model.gates[2][1] == GateData("ghost")
+    assert model.gates[1][0] == GateData("wire")
+
+
+@pytest.mark.parametrize(
+    "circuit", list(circuit_data.values()), ids=list(circuit_data.keys())
+)
+def test_json_round_trip(circuit: QuantumCircuit) -> None:
+    model = to_model(circuit)
+    restored = CircuitData.from_json(model.to_json())  # type: ignore
+    assert restored.qubit_count == model.qubit_count
+    assert restored.layer_count == model.layer_count
+    assert model.gates == restored.gates
+
+
+def test_from_gate_sequence_without_qubit_count() -> None:
+    gates = [GateData("X", [1]), GateData("SWAP", [0, 3])]
+    model = CircuitData.from_gate_sequence(gates)
+    assert model.qubit_count == 4
+    assert model.layer_count == 2
+    assert isinstance(model.gates, GateGrid)
+    np.testing.assert_array_equal(model.gates.layers, [0, 1])
+
+
+def test_gate_data_is_immutable() -> None:
+    gate = GateData("CNOT", [2], [ControlQubitInfo(0, 1), ControlQubitInfo(4, 0)])
+    assert gate.indices == (2, 0, 4)
+    assert gate.control_indices == (0, 4)
+    assert gate.control_values == (1, 0)
+    assert (gate.min_index, gate.max_index) == (0, 4)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        gate.name = "X"  # type: ignore
+    assert pickle.loads(pickle.dumps(gate)) == gate
+    assert GateData.from_json(gate.to_json()) == gate  # type: ignore
+
+
+@pytest.mark.parametrize(
+    "circuit", list(circuit_data.values()), ids=list(circuit_data.keys())
+)
+def test_from_jsonl(circuit: QuantumCircuit) -> None:
+    model = to_model(circuit)
+    assert isinstance(model.gates, GateGrid)
+    lines = "".join(gate.to_json() + "\n" for gate in model.gates.table)  # type: ignore
+
+    streamed = CircuitData.from_jsonl(io.StringIO(lines), model.qubit_count)
+    assert streamed == model
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "gates.jsonl")
+        with open(path, "w") as f:
+            f.write(lines)
+        assert CircuitData.from_jsonl(path, model.qubit_count) == model
+
+
+def test_from_gate_stream() -> None:
+    gates = (GateData("X", [qubit]) for qubit in [0, 2, 0])
+    model = CircuitData.from_gate_stream(gates)
+    assert (model.qubit_count, model.layer_count) == (3, 2)
+
+    with pytest.raises(ValueError):
+        CircuitData.from_gate_stream([GateData("X", [3])], 2)
+
+
+@pytest.mark.parametrize(
+    "circuit", list(circuit_data.values()), ids=list(circuit_data.keys())
+)
+def test_builder_snapshots(circuit: QuantumCircuit) -> None:
+    model = to_model(circuit)
+    assert isinstance(model.gates, GateGrid)
+    gates = list(model.gates.table)
+
+    builder = CircuitDataBuilder(model.qubit_count)
+    snapshots = []
+    for i, gate in enumerate(gates):
+        builder.append(gate)
+        snapshots.append((i + 1, builder.snapshot()))
+
+    assert builder.snapshot() == model
+    for gate_count, snapshot in snapshots:
+        expected = CircuitData.from_gate_sequence(gates[:gate_count], model.qubit_count)
+        assert snapshot == expected
+
+
+def test_builder_growth() -> None:
+    builder = CircuitDataBuilder(3)
+    gates = [GateData("X", [i % 3]) for i in range(100)]
+    gates += [GateData("CNOT", [0], [ControlQubitInfo(2, 0)]) for _ in range(50)]
+    first = builder.snapshot()
+    builder.extend(gates[:70])
+    middle = builder.snapshot()
+    builder.extend(gates[70:])
+
+    assert first.layer_count == 0
+    assert middle == CircuitData.from_gate_sequence(gates[:70], 3)
+    assert builder.snapshot() == CircuitData.from_gate_sequence(gates, 3)
+
+
+def test_builder_snapshot_is_unchanged_by_append() -> None:
+    builder = CircuitDataBuilder(4)
+    gates = [GateData("X", [i % 4]) for i in range(8)]
+    gates.append(GateData("CNOT", [3], [ControlQubitInfo(0, 1)]))
+    builder.extend(gates[:5])
+    before = builder.snapshot()
+    # Both gates are placed before the layer count of the snapshot.
+    builder.extend(gates[5:7])
+    middle = builder.snapshot()
+    builder.extend(gates[7:])
+
+    # The snapshots are read only after the gates are appended.
+    assert before == CircuitData.from_gate_sequence(gates[:5], 4)
+    assert middle == CircuitData.from_gate_sequence(gates[:7], 4)
+    after = builder.snapshot()
+    assert after == CircuitData.from_gate_sequence(gates, 4)
+    assert after.gates[1][1].name == "X"
+    assert after.gates[3][2].name == "CNOT"
+
+
+def test_gate_without_target_is_not_placed() -> None:
+    gates = [GateData("X", [0]), GateData("PauliRotation"), GateData("X", [0])]
+    model = CircuitData.from_gate_sequence(gates, 1)
+    assert isinstance(model.gates, GateGrid)
+    np.testing.assert_array_equal(model.gates.layers, [0, -1, 1])
+    np.testing.assert_array_equal(model.gates.ids, [[0, 2]])
+
+    builder = CircuitDataBuilder(1)
+    builder.extend(gates)
+    snapshot = builder.snapshot()
+    assert snapshot == model
+    assert isinstance(snapshot.gates, GateGrid)
+    assert snapshot.gates.layers.tolist() == [0, -1, 1]
+
+
+def test_update_model() -> None:
+    circuit = QuantumCircuit(3)
+    builder = CircuitDataBuilder(3)
+    for qubit in range(3):
+        circuit.add_H_gate(qubit)
+        circuit.add_CNOT_gate(qubit, (qubit + 1) % 3)
+        assert update_model(builder, circuit) == to_model(circuit)
+
+    with pytest.raises(ValueError):
+        update_model(CircuitDataBuilder(2), circuit)
@@ -0,0 +1,104 @@
+import pytest
+from qulacs import QuantumCircuit
+from qulacs.gate import CNOT
+
+from qulacsvis.models.circuit import GateGrid
+from qulacsvis.qulacs.circuit import (
+    ConversionCache,
+    conversion_cache,
+    fingerprint,
+    to_model,
+    to_models,
+)
+
+from .circuit_test_data import load_circuit_data
+
+circuit_data = load_circuit_data()
+
+
+def test_fingerprint() -> None:
+    circuit = QuantumCircuit(2)
+    circuit.add_RX_gate(0, 0.1)
+    circuit.add_CNOT_gate(0, 1)
+    same = QuantumCircuit(2)
+    same.add_RX_gate(0, 0.2)
+    same.add_CNOT_gate(0, 1)
+    other = QuantumCircuit(2)
+    other.add_RX_gate(0, 0.1)
+    other.add_CNOT_gate(1, 0)
+
+    # Parameters are not drawn, so they do not change the fingerprint.
+    assert fingerprint(circuit) == fingerprint(same)
+    assert fingerprint(circuit) != fingerprint(other)
+
+
+def test_to_model_is_cached() -> None:
+    conversion_cache.clear()
+    circuit = QuantumCircuit(3)
+    circuit.add_H_gate(0)
+    circuit.add_CNOT_gate(0, 2)
+
+    model = to_model(circuit)
+    assert to_model(circuit) == model
+    assert to_model(circuit, use_cache=False) == model
+    info = conversion_cache.info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+    circuit.add_X_gate(1)
+    assert to_model(circuit) != model
+    circuit.remove_gate(2)
+    circuit.add_Y_gate(1)
+    assert to_model(circuit) == to_model(circuit, use_cache=False)
+    assert conversion_cache.info().misses == 3
+
+
+def test_cache_sees_replaced_gate() -> None:
+    conversion_cache.clear()
+    circuit = QuantumCircuit(3)
+    circuit.add_CNOT_gate(0, 1)
+    circuit.add_CNOT_gate(1, 2)
+    circuit.add_H_gate(0)
+    to_model(circuit)
+
+    # The summary of the circuit does not change, but the control qubit does.
+    circuit.remove_gate(0)
+    circuit.add_gate(CNOT(2, 1), 0)
+    model = to_model(circuit)
+    assert model == to_model(circuit, use_cache=False)
+    assert model.gates[1][0].control_indices == (2,)
+    assert conversion_cache.info().misses == 2
+
+
+def test_cached_model_is_not_shared() -> None:
+    conversion_cache.clear()
+    circuit = QuantumCircuit(3)
+    circuit.add_CNOT_gate(0, 2)
+
+    to_model(circuit).qubit_count = 99
+    model = to_model(circuit)
+    assert model.qubit_count == 3
+    assert isinstance(model.gates, GateGrid)
+    assert not model.gates.ids.flags.writeable
+    assert isinstance(model.gates.table, tuple)
+    assert conversion_cache.info().hits == 1
+
+
+def test_lru_eviction() -> None:
+    cache = ConversionCache(maxsize=2)
+    models = [to_model(QuantumCircuit(n), use_cache=False) for n in range(1, 4)]
+    for key, model in enumerate(models):
+        cache.put(key, model)
+
+    assert cache.get(0) is None
+    assert cache.get(1) is models[1]
+    cache.resize(1)
+    assert cache.get(2) is None
+    info = cache.info()
+    assert (info.hits, info.misses, info.evictions) == (1, 2, 2)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_to_models(workers: int) -> None:
+    circuits = list(circuit_data.values())
+    models = to_models(circuits, workers=workers, chunksize=4, serial_threshold=0)
+    assert models == [to_model(circuit, use_cache=False) for circuit in circuits]
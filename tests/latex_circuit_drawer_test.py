@@ -1,13 +1,21 @@
+import asyncio
+import os
 import sys
 from pathlib import Path
 
 import matplotlib
 import matplotlib.pyplot as plt
+import numpy as np
 import pytest
 from packaging.version import Version
 from qulacs import QuantumCircuit
 
 from qulacsvis import circuit_drawer
+from qulacsvis.visualization import (
+    circuit_drawer_async,
+    render_latex_batch,
+    render_latex_parallel,
+)
 
 from .circuit_test_data import load_circuit_data
 
@@ -48,3 +56,35 @@ def test_draw_with_mpl(circuit: QuantumCircuit) -> matplotlib.figure.Figure:
     fig, ax = plt.subplots()
     ax.imshow(img)
     return fig
+
+
+@pytest.mark.runlatex
+def test_render_latex_batch() -> None:
+    circuits = list(testdatas.values())
+    images = render_latex_batch(circuits, ppi=100)
+    assert len(images) == len(circuits)
+    for circuit, image in zip(circuits, images):
+        expected = circuit_drawer(circuit, "latex", ppi=100)
+        assert np.array_equal(np.asarray(image), np.asarray(expected))
+
+
+@pytest.mark.runlatex
+def test_render_latex_parallel(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    circuits = list(testdatas.values())
+    results = list(render_latex_parallel(iter(circuits), ppi=100, max_in_flight=3))
+
+    assert sorted(result.position for result in results) == list(range(len(circuits)))
+    for result in results:
+        assert result.error is None
+        expected = circuit_drawer(circuits[result.position], "latex", ppi=100)
+        assert np.array_equal(np.asarray(result.image), np.asarray(expected))
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.runlatex
+def test_circuit_drawer_async_latex() -> None:
+    circuit = testdatas["cnot_gate_circuit"]
+    image = asyncio.run(circuit_drawer_async(circuit, "latex", ppi=100, timeout=60))
+    expected = circuit_drawer(circuit, "latex", ppi=100)
+    assert np.array_equal(np.asarray(image), np.asarray(expected))
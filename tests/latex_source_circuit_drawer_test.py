@@ -1,9 +1,13 @@
+import io
 import os
 
 import pytest
 from qulacs import QuantumCircuit
 
 from qulacsvis import circuit_drawer
+from qulacsvis.qulacs.circuit import to_model
+from qulacsvis.visualization import LatexSourceGenerator
+from qulacsvis.visualization.latex import batch_preamble, iter_batch_lines
 
 from .circuit_test_data import load_circuit_data
 
@@ -34,3 +38,35 @@ def test_latex_circuit_drawer(circuit: QuantumCircuit, expected_path: str) -> No
         assert out == expected
     else:
         raise Exception("Output is not a string")
+
+
+@pytest.mark.parametrize("circuit,expected_path", test_table)
+def test_latex_source_write(circuit: QuantumCircuit, expected_path: str) -> None:
+    with open(expected_path, "r") as f:
+        expected = f.read()
+    generator = LatexSourceGenerator(to_model(circuit))
+
+    stream = io.StringIO()
+    generator.write(stream)
+    assert stream.getvalue() == expected
+
+    lines = list(generator.iter_lines())
+    assert "".join(lines) == expected
+    assert all(line.endswith("\n") for line in lines[:-1])
+    assert expected.startswith(generator.preamble + r"\begin{document}")
+
+
+def test_latex_batch_source() -> None:
+    models = [to_model(circuit) for circuit in circuit_data.values()]
+    source = "".join(iter_batch_lines(models))
+
+    assert source.startswith(batch_preamble() + r"\begin{document}")
+    assert source.endswith(r"\end{document}")
+    assert r"{standalone}" in batch_preamble() and "multi" in batch_preamble()
+    # Each circuit is drawn on its own page as it is in its own document.
+    pages = source.split(r"\begin{standalone}" + "\n")[1:]
+    assert len(pages) == len(models)
+    for model, page in zip(models, pages):
+        circuit_lines = "".join(LatexSourceGenerator(model).iter_circuit_lines())
+        assert page.startswith(circuit_lines + r"\end{standalone}")
+        assert circuit_lines in LatexSourceGenerator(model).generate()
@@ -1,9 +1,18 @@
+import asyncio
 import os
 import tempfile
+from pathlib import Path
+from typing import List
 
 import pytest
 
-from qulacsvis.utils.latex import _LatexCompiler, _PDFtoImage
+from qulacsvis.utils.latex import (
+    LatexError,
+    LatexSession,
+    _clear_directory,
+    _LatexCompiler,
+    _PDFtoImage,
+)
 
 
 @pytest.mark.runlatex
@@ -43,3 +52,175 @@ def test_fail_compile() -> None:
         with tempfile.TemporaryDirectory() as tmpdir:
             latex = _LatexCompiler()
             latex.compile(code, tmpdir, "test")
+
+
+@pytest.mark.runlatex
+def test_compile_lines() -> None:
+    lines = [
+        r"\documentclass{article}" + "\n",
+        r"\begin{document}" + "\n",
+        "Test Document Body\n",
+        r"\end{document}",
+    ]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        latex = _LatexCompiler()
+        latex.compile(iter(lines), tmpdir, "test")
+        assert os.path.exists(os.path.join(tmpdir, "test.pdf"))
+
+
+@pytest.mark.runlatex
+def test_compile_with_format() -> None:
+    preamble = "\\documentclass{article}\n"
+    code = (
+        preamble
+        + r"""
+    \begin{document}
+    Test Document Body
+    \end{document}
+    """
+    )
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        latex = _LatexCompiler(format_dir=os.path.join(tmpdir, "formats"))
+        format_name = latex.dump_format(preamble)
+        assert format_name is not None
+        assert os.path.exists(os.path.join(tmpdir, "formats", format_name + ".fmt"))
+
+        latex.compile(code, tmpdir, "test", preamble=preamble)
+        assert os.path.exists(os.path.join(tmpdir, "test.pdf"))
+
+
+@pytest.mark.runlatex
+def test_compile_without_format() -> None:
+    # The format cannot be dumped, so the code is compiled as is.
+    preamble = "\\documentclass{article}\n\\usepackage{no-such-package}\n"
+    code = r"""
+    \documentclass{article}
+    \begin{document}
+    Test Document Body
+    \end{document}
+    """
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        latex = _LatexCompiler(format_dir=os.path.join(tmpdir, "formats"))
+        assert latex.dump_format(preamble) is None
+        latex.compile(code, tmpdir, "test", preamble=preamble)
+        assert os.path.exists(os.path.join(tmpdir, "test.pdf"))
+
+
+@pytest.mark.runlatex
+def test_fail_compile_without_error_files(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    code = r"""
+    \documentclass{article}
+    \begin{document}
+    % missing end
+    """
+
+    monkeypatch.chdir(tmp_path)
+    latex = _LatexCompiler()
+    with pytest.raises(LatexError) as excinfo:
+        latex.compile(code, str(tmp_path / "build"), "test", error_dir=None)
+    assert excinfo.value.log
+    assert not os.path.exists(tmp_path / "latex_error.log")
+
+
+@pytest.mark.runlatex
+def test_convert_to_bytes() -> None:
+    code = r"""
+    \documentclass{article}
+    \begin{document}
+    Test Document Body
+    \end{document}
+    """
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        latex = _LatexCompiler()
+        pdftoimage = _PDFtoImage()
+        latex.compile(code, tmpdir, "test")
+
+        png = pdftoimage.convert_to_bytes(os.path.join(tmpdir, "test"))
+        assert png.startswith(b"\x89PNG")
+        assert not os.path.exists(os.path.join(tmpdir, "test.png"))
+        pdftoimage.convert(os.path.join(tmpdir, "test"))
+        with open(os.path.join(tmpdir, "test.png"), "rb") as f:
+            assert f.read() == png
+
+
+def test_clear_directory(tmp_path: Path) -> None:
+    (tmp_path / "test.tex").write_text("code")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "test.aux").write_text("aux")
+    _clear_directory(str(tmp_path))
+    assert tmp_path.is_dir()
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.runlatex
+def test_session_workspace(tmp_path: Path) -> None:
+    with LatexSession(scratch_dir=str(tmp_path)) as session:
+        with session.workspace() as first:
+            with session.workspace() as second:
+                assert first != second
+            session.latex.compile(
+                r"\documentclass{article}\begin{document}Body\end{document}",
+                first,
+                "test",
+            )
+            session.pdftoimage.convert_to_bytes(os.path.join(first, "test"))
+
+        # The directory is emptied and lent to the next job.
+        with session.workspace() as third:
+            assert third in (first, second)
+            assert os.listdir(third) == []
+        assert os.path.isdir(first)
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.runlatex
+def test_session_workspace_async(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    async def fail(session: LatexSession) -> str:
+        async with session.workspace_async() as workspace:
+            with pytest.raises(LatexError):
+                await session.latex.compile_async(
+                    r"\documentclass{article}\begin{document}", workspace, "test"
+                )
+            assert os.listdir(workspace) != []
+        return workspace
+
+    async def fail_concurrently(session: LatexSession) -> List[str]:
+        return list(await asyncio.gather(fail(session), fail(session)))
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "scratch").mkdir()
+    with LatexSession(scratch_dir=str(tmp_path / "scratch")) as session:
+        first, second = asyncio.run(fail_concurrently(session))
+        assert first != second
+        assert os.listdir(first) == os.listdir(second) == []
+
+    # The logs of the concurrent jobs are not saved in the current directory.
+    assert os.listdir(tmp_path) == ["scratch"]
+
+
+@pytest.mark.runlatex
+def test_session_workspace_cleanup_failure(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def fail_to_clear(path: str) -> None:
+        raise PermissionError(path)
+
+    with LatexSession(scratch_dir=str(tmp_path)) as session:
+        monkeypatch.setattr("qulacsvis.utils.latex._clear_directory", fail_to_clear)
+        # The exception of the job is not replaced by the one of the cleanup.
+        with pytest.raises(ValueError):
+            with session.workspace() as first:
+                raise ValueError
+        assert not os.path.exists(first)
+
+        monkeypatch.undo()
+        with session.workspace() as second:
+            assert second != first
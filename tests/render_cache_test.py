@@ -0,0 +1,175 @@
+import asyncio
+import io
+import os
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+from PIL import Image
+from qulacs import QuantumCircuit
+
+from qulacsvis import circuit_drawer
+from qulacsvis.models.binary import dump_binary, load_binary
+from qulacsvis.qulacs.circuit import to_model
+from qulacsvis.utils.cache import DiskCache
+from qulacsvis.visualization import LatexSourceGenerator, circuit_drawer_async
+from qulacsvis.visualization.circuit_drawer import _cache_key
+
+from .circuit_test_data import load_circuit_data
+
+circuit_data = load_circuit_data()
+
+
+def test_circuit_digest(tmp_path: Path) -> None:
+    circuit = QuantumCircuit(3)
+    circuit.add_RX_gate(0, 0.1)
+    circuit.add_CNOT_gate(0, 2)
+    same = QuantumCircuit(3)
+    same.add_RX_gate(0, 0.2)
+    same.add_CNOT_gate(0, 2)
+    other = QuantumCircuit(3)
+    other.add_RX_gate(0, 0.1)
+    other.add_CNOT_gate(2, 0)
+
+    model = to_model(circuit, use_cache=False)
+    dump_binary(model, tmp_path / "circuit.bin")
+    assert model.digest() == to_model(same, use_cache=False).digest()
+    assert model.digest() == load_binary(tmp_path / "circuit.bin").digest()
+    assert model.digest() != to_model(other, use_cache=False).digest()
+
+
+def test_disk_cache(tmp_path: Path) -> None:
+    cache = DiskCache(tmp_path / "cache", max_bytes=25)
+    assert cache.get("a") is None
+    cache.put("a", b"0" * 10)
+    cache.put("b", b"1" * 10)
+    assert cache.get("a") == b"0" * 10
+    # "b" is the least recently used.
+    os.utime(cache.directory + "/b", ns=(0, 0))
+    cache.put("c", b"2" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("c") == b"2" * 10
+    info = cache.info()
+    assert (info.hits, info.misses, info.evictions) == (2, 2, 1)
+    assert (info.maxsize, info.currsize) == (25, 20)
+    assert sorted(os.listdir(cache.directory)) == ["a", "c"]
+
+    # Another instance sharing the directory sees the stored values.
+    assert DiskCache(cache.directory).get("a") == b"0" * 10
+
+    cache.resize(10)
+    assert cache.info().currsize == 10
+    cache.clear()
+    assert cache.info() == (0, 0, 0, 10, 0)
+
+
+def test_disk_cache_scans_only_over_budget(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    stale = tmp_path / "stale.tmp"
+    stale.write_bytes(b"0")
+    os.utime(stale, (0, 0))
+    (tmp_path / "fresh.tmp").write_bytes(b"1")
+    cache = DiskCache(tmp_path, max_bytes=25)
+    # Temporary files left by crashed writers are removed.
+    assert sorted(os.listdir(tmp_path)) == ["fresh.tmp"]
+
+    scans = []
+    scandir = os.scandir
+
+    def counting_scandir(path: str) -> Any:
+        scans.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+    cache.put("a", b"0" * 10)
+    cache.put("a", b"1" * 10)
+    cache.put("b", b"2" * 10)
+    assert scans == []
+    cache.put("c", b"3" * 10)
+    assert len(scans) == 1
+    assert cache.get("a") is None
+
+
+def test_cache_key_depends_on_renderer(monkeypatch: pytest.MonkeyPatch) -> None:
+    circuit = to_model(circuit_data["cnot_gate_circuit"])
+    key = _cache_key(circuit, "latex", dict(ppi=150))
+    assert _cache_key(circuit, "latex", dict(ppi=150)) == key
+
+    module = sys.modules["qulacsvis.visualization.circuit_drawer"]
+    monkeypatch.setattr(module, "__version__", "0.0.0")
+    assert _cache_key(circuit, "latex", dict(ppi=150)) != key
+    monkeypatch.undo()
+    monkeypatch.setattr(
+        LatexSourceGenerator, "preamble", property(lambda self: "\\usepackage{x}")
+    )
+    assert _cache_key(circuit, "latex", dict(ppi=150)) != key
+
+
+@pytest.mark.parametrize(
+    "output_method,options",
+    [
+        ("text_source", {}),
+        ("text_source", {"verbose": True}),
+        ("text_source", {"compact": True, "dot": "small"}),
+        ("text_source", {"layers": (1, 2), "qubits": (1, 3)}),
+        ("latex_source", {}),
+    ],
+)
+def test_circuit_drawer_cache(output_method: str, options: Any, tmp_path: Path) -> None:
+    circuit = circuit_data["skqulacs_qcl_ansatz"]
+    cache = DiskCache(tmp_path)
+    expected = circuit_drawer(circuit, output_method, **options)
+
+    assert circuit_drawer(circuit, output_method, cache=cache, **options) == expected
+    assert circuit_drawer(circuit, output_method, cache=cache, **options) == expected
+    info = cache.info()
+    assert (info.hits, info.misses) == (1, 1)
+
+    # Options of the other output methods do not change the key.
+    circuit_drawer(circuit, output_method, cache=cache, ppi=300, scale=1.0, **options)
+    assert cache.info().misses == 1
+
+
+def test_circuit_drawer_text_cache(tmp_path: Path, capfd: Any) -> None:
+    circuit = circuit_data["skqulacs_qcl_ansatz"]
+    cache = DiskCache(tmp_path / "cache")
+    circuit_drawer(circuit, output_method="text")
+    expected, _ = capfd.readouterr()
+
+    # The text output shares the entry stored for the text source.
+    source = circuit_drawer(circuit, output_method="text_source", cache=cache)
+    circuit_drawer(
+        circuit, output_method="text", filename=str(tmp_path / "c.txt"), cache=cache
+    )
+    out, _ = capfd.readouterr()
+    assert out == expected
+    with open(tmp_path / "c.txt", encoding="utf-8") as f:
+        assert f.read() == source
+    assert cache.info().hits == 1
+
+
+def test_circuit_drawer_latex_cache(tmp_path: Path) -> None:
+    circuit = to_model(circuit_data["cnot_gate_circuit"])
+    cache = DiskCache(tmp_path / "cache")
+    image = Image.new("RGB", (4, 3), "white")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    png = buffer.getvalue()
+    cache.put(_cache_key(circuit, "latex", dict(ppi=150)), png)
+
+    # The stored image is returned without running pdflatex.
+    out = circuit_drawer(circuit, "latex", cache=cache, return_bytes=True)
+    assert out == png
+    out = circuit_drawer(
+        circuit, "latex", cache=cache, filename=str(tmp_path / "c.png")
+    )
+    assert isinstance(out, Image.Image) and out.size == (4, 3)
+    assert (tmp_path / "c.png").read_bytes() == png
+    out = asyncio.run(
+        circuit_drawer_async(circuit, "latex", cache=cache, return_bytes=True)
+    )
+    assert out == png
+    assert cache.info().hits == 3
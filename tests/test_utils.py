@@ -1,4 +1,3 @@
-import dataclasses
 from typing import Any, Dict, List
 
 from qulacsvis.models.circuit import GateDataSeq
@@ -9,6 +8,6 @@ def dataclasses_to_dict(circuit: GateDataSeq) -> List[List[Dict[str, Any]]]:
     for gates in circuit:
         gate_dicts = []
         for gate in gates:
-            gate_dicts.append(dataclasses.asdict(gate))
+            gate_dicts.append(gate.to_dict())  # type: ignore
         res.append(gate_dicts)
     return res
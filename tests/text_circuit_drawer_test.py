@@ -1,10 +1,19 @@
+import dataclasses
+import io
 import os
+from pathlib import Path
 from typing import Any
 
+import numpy as np
 import pytest
 from qulacs import QuantumCircuit
+from qulacs.gate import PauliRotation
 
 from qulacsvis import circuit_drawer
+from qulacsvis.models.binary import dump_binary, load_binary
+from qulacsvis.qulacs.circuit import to_model
+from qulacsvis.visualization import CompactTextCircuitDrawer, TextCircuitDrawer
+from qulacsvis.visualization.text import template_cache
 
 from .circuit_test_data import empty_circuit, load_circuit_data
 
@@ -44,3 +53,173 @@ def test_text_circuit_drawer(
         expected = f.read()
 
     assert out == expected
+
+
+@pytest.mark.parametrize("circuit,expected_path", test_table)
+def test_text_circuit_drawer_from_serialized_model(
+    circuit: QuantumCircuit, expected_path: str, capfd: Any, tmp_path: Path
+) -> None:
+    dump_binary(to_model(circuit), tmp_path / "circuit.bin")
+    circuit_drawer(load_binary(tmp_path / "circuit.bin"), output_method="text")
+    out, _ = capfd.readouterr()
+    with open(expected_path, "r") as f:
+        expected = f.read()
+
+    assert out == expected
+
+
+@pytest.mark.parametrize("circuit,expected_path", test_table)
+def test_text_circuit_drawer_grows_picture(
+    circuit: QuantumCircuit, expected_path: str, capfd: Any
+) -> None:
+    # With no layers reserved up front, the picture is grown for every layer.
+    model = dataclasses.replace(to_model(circuit), layer_count=0)
+    circuit_drawer(model, output_method="text")
+    out, _ = capfd.readouterr()
+    with open(expected_path, "r") as f:
+        expected = f.read()
+
+    assert out == expected
+
+
+@pytest.mark.parametrize("circuit,expected_path", test_table)
+def test_text_source(circuit: QuantumCircuit, expected_path: str, capfd: Any) -> None:
+    # The fixtures are folded at 79 columns, the width of a fallback terminal.
+    drawer = TextCircuitDrawer(circuit)
+    drawer.draw(verbose=False)
+    out, _ = capfd.readouterr()
+    assert drawer.render(width=79) == out
+
+    stream = io.StringIO()
+    drawer.write(stream, width=79)
+    assert stream.getvalue() == out
+
+    unfolded = drawer.render()
+    assert "#" not in unfolded
+    assert circuit_drawer(circuit, output_method="text_source") == unfolded
+
+
+def test_text_circuit_drawer_writes_file(tmp_path: Path, capfd: Any) -> None:
+    circuit = circuit_data["cnot_gate_circuit"]
+    circuit_drawer(circuit, output_method="text", filename=str(tmp_path / "c.txt"))
+    out, _ = capfd.readouterr()
+    with open(tmp_path / "c.txt", encoding="utf-8") as f:
+        assert f.read() == out
+
+
+def test_gate_without_target_is_skipped(capfd: Any) -> None:
+    circuit = QuantumCircuit(2)
+    circuit.add_H_gate(0)
+    circuit.add_gate(PauliRotation([], [], 0.3))
+    circuit.add_CNOT_gate(0, 1)
+    expected = QuantumCircuit(2)
+    expected.add_H_gate(0)
+    expected.add_CNOT_gate(0, 1)
+
+    circuit_drawer(expected, output_method="text")
+    expected_out, _ = capfd.readouterr()
+    circuit_drawer(circuit, output_method="text")
+    out, _ = capfd.readouterr()
+    caution, drawing = out.split("\n", 1)
+    assert caution.startswith("CAUTION: The 1-th Gate you added is skipped.")
+    assert drawing == expected_out
+    assert to_model(circuit).layer_count == 2
+
+
+@pytest.mark.parametrize("circuit,expected_path", test_table)
+def test_text_window_of_whole_circuit(
+    circuit: QuantumCircuit, expected_path: str
+) -> None:
+    model = to_model(circuit)
+    drawer = TextCircuitDrawer(
+        model, layers=(0, model.layer_count), qubits=(0, model.qubit_count)
+    )
+    assert drawer.render(verbose=True) == TextCircuitDrawer(model).render(verbose=True)
+
+
+def test_text_window() -> None:
+    circuit = QuantumCircuit(3)
+    circuit.add_X_gate(0)
+    circuit.add_CNOT_gate(2, 0)
+    circuit.add_X_gate(2)
+    expected = (
+        "...          \n"
+        "      |      \n"
+        "      |      \n"
+        "...---|---...\n"
+        "      |      \n"
+        "      |      \n"
+        "      |      \n"
+        "...---●---...\n"
+        "             \n"
+    )
+    drawer = TextCircuitDrawer(circuit, layers=(1, 2), qubits=(1, 3))
+    assert drawer.render() == expected
+    assert (
+        circuit_drawer(
+            circuit, output_method="text_source", layers=(1, 2), qubits=(1, 3)
+        )
+        == expected
+    )
+
+
+def test_text_window_out_of_circuit() -> None:
+    circuit = circuit_data["cnot_gate_circuit"]
+    with pytest.raises(ValueError):
+        TextCircuitDrawer(circuit, layers=(100, 200))
+
+
+def test_gate_template_cache() -> None:
+    circuit = QuantumCircuit(4)
+    for _ in range(10):
+        circuit.add_H_gate(0)
+        circuit.add_H_gate(3)
+        circuit.add_CNOT_gate(0, 2)
+        circuit.add_CNOT_gate(1, 3)
+    expected = TextCircuitDrawer(circuit).render(verbose=True)
+
+    template_cache.clear()
+    assert TextCircuitDrawer(circuit).render(verbose=True) == expected
+    info = template_cache.info()
+    # H and CNOT with the control 2 qubits above the target.
+    assert info.currsize == 2
+    assert info.misses == 2
+    assert info.hits == 38
+    assert info.hit_rate == 0.95
+
+    template_cache.resize(1)
+    assert TextCircuitDrawer(circuit).render(verbose=True) == expected
+    assert template_cache.info().currsize == 1
+    template_cache.resize(256)
+
+
+def test_compact_text() -> None:
+    circuit = QuantumCircuit(3)
+    circuit.add_X_gate(0)
+    circuit.add_Y_gate(1)
+    circuit.add_Z_gate(2)
+    circuit.add_dense_matrix_gate(
+        [0, 1], np.array([[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 0, 1], [0, 0, 1, 0]])
+    )
+    circuit.add_CNOT_gate(2, 0)
+    circuit.add_X_gate(2)
+    expected = "--X--DeM--X------\n" "--Y--DeM--|------\n" "--Z-------●---X--\n"
+    assert CompactTextCircuitDrawer(circuit).render() == expected
+    assert circuit_drawer(
+        circuit, output_method="text_source", compact=True, dot="small"
+    ) == expected.replace("●", "･")
+    assert CompactTextCircuitDrawer(circuit, layers=(1, 2), qubits=(1, 3)).render() == (
+        "...      \n" "...DeM...\n" "...---...\n"
+    )
+
+
+@pytest.mark.parametrize("circuit,expected_path", test_table)
+def test_compact_text_is_smaller(circuit: QuantumCircuit, expected_path: str) -> None:
+    compact = CompactTextCircuitDrawer(circuit).render()
+    assert len(compact.splitlines()) == circuit.get_qubit_count()
+    assert len(compact) * 6 < len(TextCircuitDrawer(circuit).render())
+
+
+def test_compact_text_empty_circuit() -> None:
+    with pytest.raises(IndexError):
+        CompactTextCircuitDrawer(empty_circuit()).render()